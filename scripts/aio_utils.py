@@ -0,0 +1,14 @@
+# Small asyncio helpers shared by the Discord scripts
+import asyncio
+
+
+async def gather_bounded(aws, limit):
+    # Await the awaitables with at most `limit` of them running at once,
+    # returning their results in order
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
@@ -0,0 +1,66 @@
+#!/bin/env python
+
+# Benchmark of the bulk channel cleanup of delete_duplicate_channels.py
+# against the fake guild of fake_discord.py, reporting throughput.
+# Run from the repository root: python scripts/benchmarks/bench_cleanup.py
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from delete_duplicate_channels import DELETE_CONCURRENCY, ProjectsClient
+from fake_discord import FakeGuild, FakeHTTP
+
+
+def misconfigured_guild(n, http_args):
+    # A guild where a run created every project channel three times: twice
+    # in the project categories and once uncategorized, plus archived copies
+    # that must be kept
+    guild = FakeGuild(FakeHTTP(**http_args))
+    guild.add_channel('entrance', 'text')
+    voice = guild.add_category('Projects')
+    text = guild.add_category('Projects-text')
+    archive = guild.add_category('Projects-archive')
+    for i in range(n):
+        for kind, category in (('voice', voice), ('text', text)):
+            guild.add_channel(f'project-{i}', kind, archive)
+            guild.add_channel(f'project-{i}', kind, category)
+            guild.add_channel(f'project-{i}', kind)
+            guild.add_channel(f'project-{i}', kind, category)
+    return guild
+
+
+async def cleanup(n, concurrency, http_args):
+    guild = misconfigured_guild(n, http_args)
+    client = ProjectsClient(guild.id, duplicates=True, concurrency=concurrency)
+
+    plan = client.plan_deletions(guild)
+    start = time.perf_counter()
+    await client.delete_channels(plan)
+    elapsed = time.perf_counter() - start
+
+    assert client.stats['deleted'] == 4 * n
+    assert sum(c.category is not None and c.category.name == 'Projects-archive' for c in guild.channels) == 2 * n
+    assert any(c.name == 'entrance' for c in guild.channels)
+    return elapsed, client.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the bulk channel cleanup')
+    parser.add_argument('-n', '--projects', type=int, nargs='+', default=[25, 100])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, DELETE_CONCURRENCY])
+    parser.add_argument('--latency', type=float, default=0.1, help='seconds per REST call')
+    parser.add_argument('--bucket-limit', type=int, default=10, help='requests per bucket window')
+    parser.add_argument('--bucket-window', type=float, default=1.0, help='seconds of a bucket window')
+    args = parser.parse_args()
+
+    http_args = dict(latency=args.latency, bucket_limit=args.bucket_limit, bucket_window=args.bucket_window)
+
+    for n in args.projects:
+        for concurrency in args.concurrency:
+            elapsed, stats = asyncio.run(cleanup(n, concurrency, http_args))
+            print(f'{4 * n:>5} channels, concurrency {concurrency:>3}: {elapsed:7.2f}s '
+                  f'({stats["deleted"] / elapsed:.1f} deletions/s, {stats["retries"]} retries)')
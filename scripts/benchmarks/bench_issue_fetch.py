@@ -0,0 +1,163 @@
+#!/bin/env python
+
+# Benchmark of the REST and GraphQL backends of fetch_gh_issues against a
+# local stand-in of the GitHub API replaying recorded issues: a dump of the
+# REST issue listing (e.g. `gh api --paginate repos/ohbm/hackathon2024/issues?state=all`)
+# or synthetic issues. Reports the requests and bytes of a full sync with
+# each backend, and checks that both write the same projects.
+# Run from the repository root: python scripts/benchmarks/bench_issue_fetch.py
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import fetch_gh_issues
+from bench_issue_form import synthetic_body
+from issue_form import IssueForm
+from records_io import iter_records
+
+# Define the share of synthetic issues that are pull requests, closed, or ready
+PULL_REQUEST_RATE = 0.3
+CLOSED_RATE = 0.3
+READY_RATE = 0.2
+
+
+def synthetic_issues(count, seed=42):
+    # REST-shaped issues and pull requests, with the metadata GitHub sends
+    # along that the parser never reads
+    form = IssueForm.from_file(fetch_gh_issues.ISSUE_FORM_PATH)
+    rng = random.Random(seed)
+    issues = []
+    for number in range(count, 0, -1):
+        labels = [{'id': 1, 'name': fetch_gh_issues.ISSUE_LABEL, 'color': 'ededed', 'default': False}]
+        if rng.random() < READY_RATE:
+            labels.append({'id': 2, 'name': fetch_gh_issues.ISSUE_READY_LABEL, 'color': '0e8a16', 'default': False})
+        user = {'login': f'user{number}', 'id': number, 'type': 'User', 'site_admin': False,
+                'avatar_url': f'https://avatars.githubusercontent.com/u/{number}?v=4',
+                'html_url': f'https://github.com/user{number}'}
+        issue = {
+            'url': f'https://api.github.com/repos/{fetch_gh_issues.REPO}/issues/{number}',
+            'html_url': f'https://github.com/{fetch_gh_issues.REPO}/issues/{number}',
+            'id': 1000000 + number,
+            'node_id': f'I_{number:012d}',
+            'number': number,
+            'title': f'Project {number}',
+            'user': user,
+            'labels': labels,
+            'state': 'closed' if rng.random() < CLOSED_RATE else 'open',
+            'locked': False,
+            'assignees': [user],
+            'comments': rng.randint(0, 20),
+            'created_at': f'2024-01-01T00:00:{number % 60:02d}Z',
+            'updated_at': f'2024-05-{1 + number % 28:02d}T00:00:00Z',
+            'author_association': 'CONTRIBUTOR',
+            'reactions': {'total_count': 0, '+1': 0, '-1': 0, 'laugh': 0, 'hooray': 0,
+                          'confused': 0, 'heart': 0, 'rocket': 0, 'eyes': 0},
+            'body': synthetic_body(form, rng, 5),
+        }
+        if rng.random() < PULL_REQUEST_RATE:
+            issue['pull_request'] = {'url': issue['url'].replace('issues', 'pulls'), 'merged_at': None}
+            issue['body'] = 'Fixes a typo'
+        issues.append(issue)
+    return issues
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # Serves `issues` as the REST issue listing and the GraphQL issues
+    # connection, and counts the requests and bytes sent
+    issues = []
+    stats = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.stats['requests'] += 1
+        self.stats['bytes'] += len(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        per_page = int(query.get('per_page', ['30'])[0])
+        page = int(query.get('page', ['1'])[0])
+        last = max(1, -(-len(self.issues) // per_page))
+        base = f'http://{self.headers["Host"]}{url.path}?per_page={per_page}'
+        links = [f'<{base}&page={n}>; rel="{rel}"' for n, rel in ((page + 1, 'next'), (last, 'last')) if page < last]
+        self.reply(self.issues[(page - 1) * per_page:page * per_page], [('Link', ', '.join(links))] if links else [])
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        variables = request['variables']
+        nodes = [
+            i for i in self.issues
+            if 'pull_request' not in i
+            and (not variables['labels'] or any(l['name'] in variables['labels'] for l in i['labels']))
+            and (not variables['states'] or i['state'].upper() in variables['states'])
+        ]
+        start = int(base64.b64decode(variables['after'])) if variables['after'] else 0
+        page = nodes[start:start + variables['first']]
+        end = start + len(page)
+        self.reply({'data': {'repository': {'issues': {
+            'pageInfo': {'hasNextPage': end < len(nodes), 'endCursor': base64.b64encode(str(end).encode()).decode()},
+            'nodes': [{
+                'number': i['number'],
+                'url': i['html_url'],
+                'state': i['state'].upper(),
+                'updatedAt': i['updated_at'],
+                'body': i['body'],
+                'labels': {'nodes': [{'name': l['name']} for l in i['labels'][:variables['labelCount']]]},
+            } for i in page],
+        }}}})
+
+
+def sync(backend, url, directory):
+    StandIn.stats.update(requests=0, bytes=0)
+    os.environ.update(GH_AUTH='token', GH_API_URL=url, GH_GRAPHQL_URL=f'{url}/graphql')
+    output = os.path.join(directory, f'{backend}.json')
+    start = time.perf_counter()
+    fetch_gh_issues.fetch_gh_issues(
+        full=True, backend=backend, output_path=output,
+        cache_path=os.path.join(directory, f'{backend}-cache.json'))
+    elapsed = time.perf_counter() - start
+    print(f'{backend:>8}: {StandIn.stats["requests"]:4d} requests, '
+          f'{StandIn.stats["bytes"] / 1024:9.1f} KiB, {elapsed * 1000:7.1f}ms')
+    return list(iter_records(output))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the REST and GraphQL issue fetchers')
+    parser.add_argument('--record', help='recorded REST issue listing (JSON array or NDJSON) to replay')
+    parser.add_argument('-n', '--issues', type=int, default=1000, help='number of synthetic issues')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    StandIn.issues = list(iter_records(args.record)) if args.record else synthetic_issues(args.issues, args.seed)
+    server = HTTPServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    print(f'{len(StandIn.issues)} issues')
+
+    with tempfile.TemporaryDirectory() as directory:
+        rest = sync('rest', url, directory)
+        graphql = sync('graphql', url, directory)
+    server.shutdown()
+
+    assert rest == graphql, 'backends disagree'
+    print(f'{len(rest)} projects from both backends')
@@ -0,0 +1,107 @@
+#!/bin/env python
+
+# Micro-benchmark of the issue form parser against the per-field line
+# scan it replaced, on synthetic HackTrack issue bodies.
+# Run from the repository root: python scripts/benchmarks/bench_issue_form.py
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from issue_form import IssueForm
+
+ISSUE_FORM_PATH = '.github/ISSUE_TEMPLATE/brainhack-hacktrack-project.yml'
+
+
+# The parser previously copy-pasted in fetch_gh_issues / fetch_gh_proceedings
+def legacy_parse(body, fields):
+    lines = [l.strip() for l in body.replace('\r\n', '\n').split('\n')]
+
+    field_ordering = []
+    for field in fields:
+        field_start = None
+        field_label = field['attributes']['label']
+        for li, line in enumerate(lines):
+            is_line_title = line.startswith(f'### {field_label}')
+            if field_start is None and is_line_title:
+                field_start = li
+        field_ordering += [(field, field_start)]
+    field_ordering = list(sorted(field_ordering, key=lambda f: f[1]))
+
+    issue_info = {}
+    field_bounds = zip(field_ordering, field_ordering[1:] + [(None, None)])
+    for (field, i), (_, ni) in field_bounds:
+        field_id = field['id']
+        field_value = '\n'.join(filter(None, lines[i+1:ni]))
+        field_value = re.sub(r'<!--.*?-->', '', field_value, flags=re.DOTALL)
+        field_value = field_value.strip()
+        if field_value == '_No response_':
+            field_value = None
+        if field['type'] == 'checkboxes':
+            field_options_labels = [
+                o['label'].strip()
+                for o in field['attributes']['options']
+            ]
+            field_selected_options = []
+            for l in field_value.split('\n'):
+                if l[6:] not in field_options_labels:
+                    continue
+                if l.startswith('- [X] '):
+                    field_selected_options.append(l[6:])
+                if l.startswith('- [x] '):
+                    field_selected_options.append(l[6:])
+            field_value = field_selected_options
+        issue_info[field_id] = field_value
+    return issue_info
+
+
+def synthetic_body(form, rng, paragraph_lines):
+    # Render an issue body the way GitHub renders a submitted issue form
+    out = []
+    for field in form.fields:
+        out += [f"### {field['attributes']['label']}", '']
+        if field['type'] == 'checkboxes':
+            for option in field['attributes']['options']:
+                mark = 'X' if rng.random() < 0.5 else ' '
+                out.append(f"- [{mark}] {option['label']}")
+        elif field['type'] == 'dropdown':
+            out.append(rng.choice(field['attributes']['options']))
+        elif not field.get('validations', {}).get('required') and rng.random() < 0.3:
+            out.append('_No response_')
+        else:
+            for i in range(rng.randint(1, paragraph_lines)):
+                comment = ' <!-- hint -->' if i == 0 and rng.random() < 0.2 else ''
+                out.append(f"{field['id']} line {i} {rng.random():.6f}{comment}")
+        out.append('')
+    return '\r\n'.join(out)
+
+
+def bench(name, fn, bodies):
+    start = time.perf_counter()
+    results = [fn(body) for body in bodies]
+    elapsed = time.perf_counter() - start
+    print(f'{name:>10}: {elapsed:.3f}s ({len(bodies) / elapsed:,.0f} bodies/s)')
+    return results, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the issue form parser')
+    parser.add_argument('-n', '--issues', type=int, default=10000, help='number of synthetic bodies')
+    parser.add_argument('--lines', type=int, default=20, help='maximum lines per text field')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    form = IssueForm.from_file(ISSUE_FORM_PATH)
+    rng = random.Random(args.seed)
+    bodies = [synthetic_body(form, rng, args.lines) for _ in range(args.issues)]
+    print(f'{len(bodies)} bodies, {sum(map(len, bodies)) / 2**20:.1f} MiB')
+
+    legacy, legacy_time = bench('legacy', lambda b: legacy_parse(b, form.fields), bodies)
+    current, current_time = bench('IssueForm', form.parse, bodies)
+
+    assert legacy == current, 'parsers disagree'
+    print(f'speedup: {legacy_time / current_time:.1f}x')
@@ -0,0 +1,77 @@
+#!/bin/env python
+
+# Benchmark of the bot startup provisioning (ProjectsClient.ensure_projects)
+# against the fake guild of fake_discord.py, reporting the wall-clock time
+# to set up N projects.
+# Run from the repository root: python scripts/benchmarks/bench_provisioning.py
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import projects_bot
+from fake_discord import FakeGuild, FakeHTTP, fake_projects
+
+
+def make_client(guild):
+    client = projects_bot.ProjectsClient(0, 0)
+    client._guild = guild
+    client.index_guild()
+    client.voice_category = client.categories_by_name['Projects']
+    client.text_category = client.categories_by_name['Projects-text']
+    client.cached_roles = {
+        'muted': client.roles_by_name['muted'],
+        'staff': client.roles_by_name['Event Staff'],
+    }
+    return client
+
+
+async def provision(guild, n, concurrency):
+    # Time one startup of the bot against the guild
+    client = make_client(guild)
+    projects_bot.PROVISION_CONCURRENCY = concurrency
+    calls = sum(guild.http.calls.values())
+    start = time.perf_counter()
+    await client.ensure_projects()
+    elapsed = time.perf_counter() - start
+
+    assert len(client.projects) == n
+    return elapsed, sum(guild.http.calls.values()) - calls
+
+
+async def first_start_and_restart(n, concurrency, http_args):
+    guild = FakeGuild(FakeHTTP(**http_args))
+    guild.add_category('Projects')
+    guild.add_category('Projects-text')
+    guild.add_role('muted')
+    guild.add_role('Event Staff')
+    return await provision(guild, n, concurrency), await provision(guild, n, concurrency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the bot startup provisioning')
+    parser.add_argument('-n', '--projects', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, projects_bot.PROVISION_CONCURRENCY])
+    parser.add_argument('--latency', type=float, default=0.1, help='seconds per REST call')
+    parser.add_argument('--bucket-limit', type=int, default=10, help='requests per bucket window')
+    parser.add_argument('--bucket-window', type=float, default=1.0, help='seconds of a bucket window')
+    args = parser.parse_args()
+
+    http_args = dict(latency=args.latency, bucket_limit=args.bucket_limit, bucket_window=args.bucket_window)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.projects:
+            projects_bot.PROJECTS_PATH = os.path.join(tmp, f'projects-{n}.json')
+            with open(projects_bot.PROJECTS_PATH, 'w') as f:
+                json.dump(fake_projects(n), f)
+
+            for concurrency in args.concurrency:
+                start, restart = asyncio.run(first_start_and_restart(n, concurrency, http_args))
+                print(f'{n:>5} projects, concurrency {concurrency:>3}: '
+                      f'start {start[0]:7.2f}s ({start[1]} API calls), '
+                      f'restart {restart[0]:7.2f}s ({restart[1]} API calls)')
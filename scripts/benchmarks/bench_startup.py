@@ -0,0 +1,58 @@
+#!/bin/env python
+
+# Benchmark of the startup time of the hackathon CLI: runs `<command> --help`
+# for every subcommand in a fresh interpreter, and reports the wall-clock
+# time and which heavy packages were imported, next to a CLI importing
+# every command module up front.
+# Run from the repository root: python scripts/benchmarks/bench_startup.py
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from hackathon import COMMANDS
+
+# Define the packages whose import cost is tracked
+HEAVY_PACKAGES = ('discord', 'aiohttp', 'tweepy', 'requests', 'yaml', 'PIL')
+
+
+def run(args, repeat):
+    # Median wall-clock time of the command, and the heavy packages it
+    # imported according to -X importtime
+    times = []
+    imported = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append(time.perf_counter() - start)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            name = line.rsplit('|', 1)[-1].strip()
+            if name in HEAVY_PACKAGES:
+                imported.add(name)
+    return statistics.median(times), sorted(imported)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the hackathon CLI')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each command')
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS), help='commands to time')
+    args = parser.parse_args()
+
+    cli = os.path.join(SCRIPTS_DIR, 'hackathon.py')
+    for command in args.commands:
+        elapsed, imported = run([cli, command, '--help'], args.repeat)
+        print(f'{command:>18}: {elapsed * 1000:7.1f}ms  imports {", ".join(imported) or "-"}')
+
+    modules = ', '.join(module for module, _ in COMMANDS.values())
+    eager = f'import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); import {modules}'
+    elapsed, imported = run(['-c', eager], args.repeat)
+    print(f'{"eager imports":>18}: {elapsed * 1000:7.1f}ms  imports {", ".join(imported)}')
@@ -0,0 +1,232 @@
+#!/bin/env python
+
+# Benchmark suite of the bot scripts against the fake guild of
+# fake_discord.py: provisioning of 10/100/1000 projects, a storm of
+# reactions on the roles messages, and the bulk channel cleanup. Reports
+# throughput and p50/p99 latencies, and compares them with the baseline
+# stored in baseline.json to catch regressions.
+# Run from the repository root: python scripts/benchmarks/bench_suite.py
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import projects_bot
+from bench_cleanup import misconfigured_guild
+from bench_provisioning import make_client
+from bot_metrics import Histogram
+from delete_duplicate_channels import DELETE_CONCURRENCY, ProjectsClient as CleanupClient
+from fake_discord import FakeGuild, FakeHTTP, FakeReactionPayload, fake_projects
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Define how much worse than the baseline a result may be, and the
+# absolute slack on latencies that absorbs scheduling noise
+TOLERANCE = 0.25
+LATENCY_SLACK = 0.05
+
+
+class Recorder(Histogram):
+    # Histogram that also keeps the raw observations, for percentiles
+    def __init__(self):
+        super().__init__('recorder', '')
+        self.observed = []
+
+    def observe(self, value, **labels):
+        super().observe(value)
+        self.observed.append(value)
+
+
+def percentile(values, q):
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def summary(count, elapsed, latencies, http):
+    return {
+        'seconds': round(elapsed, 3),
+        'throughput': round(count / elapsed, 2) if elapsed else 0.0,
+        'p50': round(percentile(latencies, 50), 4),
+        'p99': round(percentile(latencies, 99), 4),
+        'api_calls': sum(http.calls.values()),
+        'rate_limited': http.rate_limited,
+    }
+
+
+def projects_guild(http_args):
+    guild = FakeGuild(FakeHTTP(**http_args))
+    guild.add_category('Projects')
+    guild.add_category('Projects-text')
+    guild.add_role('muted')
+    guild.add_role('Event Staff')
+    guild.roles_channel = guild.add_channel('roles', 'text')
+    return guild
+
+
+def write_projects(tmp, n):
+    projects_bot.PROJECTS_PATH = os.path.join(tmp, f'projects-{n}.json')
+    with open(projects_bot.PROJECTS_PATH, 'w') as f:
+        json.dump(fake_projects(n), f)
+
+
+async def bench_provisioning(n, http_args):
+    # First start of the bot: every project role and channel is created
+    guild = projects_guild(http_args)
+    client = make_client(guild)
+    client.project_setup_latency = Recorder()
+
+    start = time.perf_counter()
+    await client.ensure_projects()
+    elapsed = time.perf_counter() - start
+
+    assert len(client.projects) == n
+    return summary(n, elapsed, client.project_setup_latency.observed, guild.http)
+
+
+async def bench_reaction_storm(n, members, reactions, http_args):
+    # Every member reacts to `reactions` random projects at the same time
+    guild = projects_guild(http_args)
+    client = make_client(guild)
+    client.roles_channel = guild.roles_channel
+    client._connection.user = guild.add_member('bot')
+    await client.ensure_projects()
+    await client.ensure_roles_message()
+
+    message_of = {project.key: message_id for (message_id, _), project in client.reaction_roles.items()}
+    rng = random.Random(0)
+    expected = {}
+    payloads = []
+    for i in range(members):
+        member = guild.add_member(f'member-{i}')
+        chosen = rng.sample(list(client.projects.values()), reactions)
+        expected[member.id] = {p.role.id for p in chosen}
+        payloads += [FakeReactionPayload(message_of[p.key], p.emoji, member.id) for p in chosen]
+    rng.shuffle(payloads)
+
+    guild.http.calls.clear()
+    client.reaction_role_latency = Recorder()
+    start = time.perf_counter()
+    for payload in payloads:
+        await client.on_raw_reaction_add(payload)
+    while client._role_tasks:
+        await asyncio.gather(*list(client._role_tasks.values()))
+    elapsed = time.perf_counter() - start
+
+    for user_id, role_ids in expected.items():
+        assert {r.id for r in guild.get_member(user_id).roles if not r.is_default()} == role_ids
+    return summary(len(payloads), elapsed, client.reaction_role_latency.observed, guild.http)
+
+
+async def bench_cleanup(n, http_args):
+    guild = misconfigured_guild(n, http_args)
+    client = CleanupClient(guild.id, duplicates=True, concurrency=DELETE_CONCURRENCY)
+
+    plan = client.plan_deletions(guild)
+    start = time.perf_counter()
+    await client.delete_channels(plan)
+    elapsed = time.perf_counter() - start
+
+    assert client.stats['deleted'] == 4 * n
+    assert sum(c.category is not None and c.category.name == 'Projects-archive' for c in guild.channels) == 2 * n
+    assert any(c.name == 'entrance' for c in guild.channels)
+    latencies = [d for route, durations in guild.http.durations.items() if route.startswith('DELETE') for d in durations]
+    return summary(len(plan), elapsed, latencies, guild.http)
+
+
+def run_suite(args, http_args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.projects:
+            write_projects(tmp, n)
+            results[f'provisioning-{n}'] = asyncio.run(bench_provisioning(n, http_args))
+
+        write_projects(tmp, args.storm_projects)
+        results['reaction-storm'] = asyncio.run(bench_reaction_storm(
+            args.storm_projects, args.storm_members, args.storm_reactions, http_args))
+
+    results['cleanup'] = asyncio.run(bench_cleanup(args.cleanup_projects, http_args))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Higher throughput and lower latencies and API calls are better
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']}/s, baseline {base['throughput']}/s")
+        if result['p99'] > max(base['p99'] * (1 + tolerance), base['p99'] + LATENCY_SLACK):
+            regressions.append(f"{name}: p99 {result['p99']}s, baseline {base['p99']}s")
+        if result['api_calls'] > base['api_calls']:
+            regressions.append(f"{name}: {result['api_calls']} API calls, baseline {base['api_calls']}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark suite of the bot scripts against a fake guild')
+    parser.add_argument('-n', '--projects', type=int, nargs='+', default=[10, 100, 1000], help='projects provisioned')
+    parser.add_argument('--storm-projects', type=int, default=200, help='projects of the reaction storm')
+    parser.add_argument('--storm-members', type=int, default=200, help='members reacting in the storm')
+    parser.add_argument('--storm-reactions', type=int, default=3, help='reactions of each member')
+    parser.add_argument('--cleanup-projects', type=int, default=100, help='projects of the misconfigured guild')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per REST call')
+    parser.add_argument('--bucket-limit', type=int, default=50, help='requests per bucket window')
+    parser.add_argument('--bucket-window', type=float, default=0.25, help='seconds of a bucket window')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.01, help='share of requests answered with a 429')
+    parser.add_argument('--debounce', type=float, default=0.1, help='reaction roles debounce, in seconds')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    # Only report the failures of the bot scripts
+    logging.getLogger('discord').setLevel(logging.WARNING)
+
+    http_args = dict(latency=args.latency, bucket_limit=args.bucket_limit,
+                     bucket_window=args.bucket_window, rate_limit_rate=args.rate_limit_rate)
+    projects_bot.ROLES_DEBOUNCE = args.debounce
+    settings = dict(http_args, debounce=args.debounce, projects=args.projects,
+                    storm=[args.storm_projects, args.storm_members, args.storm_reactions],
+                    cleanup=args.cleanup_projects)
+
+    results = run_suite(args, http_args)
+    for name, r in results.items():
+        print(f"{name:>18}: {r['seconds']:8.2f}s {r['throughput']:9.1f}/s "
+              f"p50 {r['p50']:7.3f}s p99 {r['p99']:7.3f}s "
+              f"{r['api_calls']:>6} API calls {r['rate_limited']:>4} 429s")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'settings': settings, 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f'Saved the baseline to {args.baseline}')
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare with, store one with --save-baseline')
+        sys.exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['settings'] != json.loads(json.dumps(settings)):
+        print('The baseline was recorded with other settings, not comparing')
+        sys.exit(0)
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f'Regression: {regression}')
+    if regressions:
+        sys.exit(1)
+    print('No regression against the baseline')
@@ -0,0 +1,312 @@
+# In-process stand-in for the parts of a Discord guild used by the bot
+# scripts, so they can be benchmarked without a live guild. Every REST
+# call goes through FakeHTTP, which adds latency and enforces per-route
+# rate-limit buckets the way discord.py does (waiting for the bucket to
+# reset instead of failing). It can also inject 429 responses, which are
+# retried like discord.py does and raised once the retries run out.
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter, deque
+
+import discord
+
+_ids = itertools.count(1000)
+
+# Replaces the ids in a route to group calls by type
+ID_RE = re.compile(r'\d+')
+
+
+class Bucket:
+    # Sliding-window rate limit of `limit` requests per `window` seconds
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.sent = deque()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.perf_counter()
+            while self.sent and now - self.sent[0] >= self.window:
+                self.sent.popleft()
+            if len(self.sent) >= self.limit:
+                await asyncio.sleep(self.window - (now - self.sent[0]))
+                self.sent.popleft()
+            self.sent.append(time.perf_counter())
+
+
+class FakeResponse:
+    # Enough of an aiohttp response for discord.HTTPException
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+
+class FakeHTTP:
+    def __init__(self, latency=0.05, bucket_limit=5, bucket_window=1.0,
+                 rate_limit_rate=0.0, retry_after=0.1, max_retries=4, seed=0):
+        self.latency = latency
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        # Share of the requests answered with a 429, and how they are retried
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.max_retries = max_retries
+        self.random = random.Random(seed)
+        self.buckets = {}
+        self.calls = Counter()
+        self.rate_limited = 0
+        # Duration of every request, rate-limit waits included, per route
+        self.durations = {}
+
+    async def request(self, route):
+        # `route` is the bucket key, e.g. 'POST /guilds/{guild_id}/channels'
+        # with its major parameter filled in
+        bucket = self.buckets.get(route)
+        if bucket is None:
+            bucket = self.buckets[route] = Bucket(self.bucket_limit, self.bucket_window)
+        name = ID_RE.sub('{id}', route)
+
+        start = time.perf_counter()
+        for tries in range(self.max_retries + 1):
+            await bucket.acquire()
+            await asyncio.sleep(self.latency)
+            if self.random.random() >= self.rate_limit_rate:
+                break
+            self.rate_limited += 1
+            if tries == self.max_retries:
+                raise discord.HTTPException(FakeResponse(429, 'Too Many Requests'), 'You are being rate limited.')
+            await asyncio.sleep(self.retry_after)
+
+        self.calls[name] += 1
+        self.durations.setdefault(name, []).append(time.perf_counter() - start)
+
+
+class FakeRole:
+    def __init__(self, guild, name, **kwargs):
+        self.guild = guild
+        self.id = next(_ids)
+        self.name = name
+        self.mentionable = kwargs.get('mentionable', False)
+
+    @property
+    def mention(self):
+        return f'<@&{self.id}>'
+
+    def is_default(self):
+        return self is self.guild.default_role
+
+    def __repr__(self):
+        return f'<FakeRole {self.name}>'
+
+
+class FakeReaction:
+    def __init__(self, emoji, me=False):
+        self.emoji = emoji
+        self.me = me
+        self.count = 1
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embeds=None):
+        self.channel = channel
+        self.id = next(_ids)
+        self.content = content
+        self.embeds = list(embeds or [])
+        self.reactions = []
+
+    async def edit(self, content=None, embeds=None, **kwargs):
+        await self.channel.guild.http.request(f'PATCH /channels/{self.channel.id}/messages')
+        self.content = content
+        if embeds is not None:
+            self.embeds = list(embeds)
+
+    async def add_reaction(self, emoji):
+        # Reactions share one bucket per channel, as on Discord
+        await self.channel.guild.http.request(f'PUT /channels/{self.channel.id}/messages/reactions')
+        if not any(r.emoji == emoji and r.me for r in self.reactions):
+            self.reactions.append(FakeReaction(emoji, me=True))
+
+    async def remove_reaction(self, emoji, member):
+        await self.channel.guild.http.request(f'DELETE /channels/{self.channel.id}/messages/reactions')
+        self.reactions = [r for r in self.reactions if not (r.emoji == emoji and r.me)]
+
+    async def delete(self):
+        await self.channel.guild.http.request(f'DELETE /channels/{self.channel.id}/messages')
+        self.channel.messages.remove(self)
+
+
+class FakeChannel:
+    def __init__(self, guild, name, kind, category=None, overwrites=None):
+        self.guild = guild
+        self.id = next(_ids)
+        self.name = name
+        self.kind = kind
+        self.type = kind
+        self.category = category
+        self.overwrites = dict(overwrites or {})
+        self.messages = []
+
+    async def edit(self, overwrites=None, **kwargs):
+        await self.guild.http.request(f'PATCH /channels/{self.id}')
+        if overwrites is not None:
+            self.overwrites = dict(overwrites)
+        if 'category' in kwargs:
+            self.category = kwargs['category']
+
+    async def delete(self):
+        await self.guild.http.request(f'DELETE /channels/{self.id}')
+        self.guild.remove_channel(self)
+
+    async def send(self, content=None, embeds=None, **kwargs):
+        await self.guild.http.request(f'POST /channels/{self.id}/messages')
+        message = FakeMessage(self, content, embeds)
+        self.messages.append(message)
+        return message
+
+    async def history(self, limit=100, oldest_first=False):
+        messages = self.messages if oldest_first else self.messages[::-1]
+        for i, message in enumerate(messages[:limit]):
+            # One request per page of 100 messages
+            if i % 100 == 0:
+                await self.guild.http.request(f'GET /channels/{self.id}/messages')
+            yield message
+
+    def __repr__(self):
+        return f'<FakeChannel {self.kind} {self.name}>'
+
+
+class FakeCategory(FakeChannel):
+    def __init__(self, guild, name):
+        super().__init__(guild, name, 'category')
+
+    @property
+    def channels(self):
+        return [c for c in self.guild.channels if c.category is self]
+
+    @property
+    def voice_channels(self):
+        return [c for c in self.channels if c.kind == 'voice']
+
+    @property
+    def text_channels(self):
+        return [c for c in self.channels if c.kind == 'text']
+
+
+class FakeMember:
+    def __init__(self, guild, name):
+        self.guild = guild
+        self.id = next(_ids)
+        self.name = name
+        self.roles = [guild.default_role]
+
+    async def edit(self, roles=None, **kwargs):
+        await self.guild.http.request(f'PATCH /guilds/{self.guild.id}/members')
+        if roles is not None:
+            self.roles = [self.guild.default_role] + [r for r in roles if not r.is_default()]
+        return self
+
+    def __repr__(self):
+        return f'<FakeMember {self.name}>'
+
+
+class FakeReactionPayload:
+    # Shaped like discord.RawReactionActionEvent
+    def __init__(self, message_id, emoji, user_id, member=None):
+        self.message_id = message_id
+        self.emoji = emoji
+        self.user_id = user_id
+        self.member = member
+
+
+class FakeGuild:
+    def __init__(self, http=None, name='Fake guild'):
+        self.http = http or FakeHTTP()
+        self.id = next(_ids)
+        self.name = name
+        self.default_role = FakeRole(self, '@everyone')
+        self.roles = [self.default_role]
+        self.channels = []
+        self._roles = {self.default_role.id: self.default_role}
+        self._channels = {}
+        self._members = {}
+
+    @property
+    def categories(self):
+        return [c for c in self.channels if c.kind == 'category']
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def add_role(self, name, **kwargs):
+        role = FakeRole(self, name, **kwargs)
+        self.roles.append(role)
+        self._roles[role.id] = role
+        return role
+
+    def add_category(self, name):
+        category = FakeCategory(self, name)
+        self.channels.append(category)
+        self._channels[category.id] = category
+        return category
+
+    def add_channel(self, name, kind, category=None, overwrites=None):
+        channel = FakeChannel(self, name, kind, category, overwrites)
+        self.channels.append(channel)
+        self._channels[channel.id] = channel
+        return channel
+
+    def add_member(self, name):
+        member = FakeMember(self, name)
+        self._members[member.id] = member
+        return member
+
+    def remove_channel(self, channel):
+        self.channels.remove(channel)
+        del self._channels[channel.id]
+
+    async def fetch_member(self, user_id):
+        await self.http.request(f'GET /guilds/{self.id}/members')
+        return self._members[user_id]
+
+    async def create_role(self, name, **kwargs):
+        await self.http.request(f'POST /guilds/{self.id}/roles')
+        return self.add_role(name, **kwargs)
+
+    async def create_category(self, name, **kwargs):
+        await self.http.request(f'POST /guilds/{self.id}/channels')
+        return self.add_category(name)
+
+    async def create_voice_channel(self, name, category=None, overwrites=None, **kwargs):
+        await self.http.request(f'POST /guilds/{self.id}/channels')
+        return self.add_channel(name, 'voice', category, overwrites)
+
+    async def create_text_channel(self, name, category=None, overwrites=None, **kwargs):
+        await self.http.request(f'POST /guilds/{self.id}/channels')
+        return self.add_channel(name, 'text', category, overwrites)
+
+
+def fake_projects(n):
+    # Project records shaped like _data/discord_projects.json
+    return [
+        {
+            'title': f'Project {i}',
+            'chatchannel': f'project-{i}',
+            'issue_link': f'https://github.com/ohbm/hackathon2024/issues/{i}',
+            'issue_number': i,
+        }
+        for i in range(n, 0, -1)
+    ]
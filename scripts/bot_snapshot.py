@@ -0,0 +1,42 @@
+# Snapshot of the resolved state of the projects bot, for warm restarts
+import json
+import os
+
+from records_io import atomic_write
+
+# Default location of the snapshot, relative to the repository root
+SNAPSHOT_PATH = './.cache/bot_state.json'
+
+
+class BotSnapshot:
+    def __init__(self, guild_id, path=SNAPSHOT_PATH):
+        self.path = path
+        self.guild_id = guild_id
+        # Project key -> {'role': id, 'voice': id, 'text': id, 'emoji': str}
+        self.projects = {}
+        # Ids of the roles messages, and the digest of their rendering
+        self.roles_messages = []
+        self.roles_digest = None
+
+    @classmethod
+    def load(cls, guild_id, path=SNAPSHOT_PATH):
+        # Snapshots of another guild are ignored
+        snapshot = cls(guild_id, path)
+        if not os.path.exists(path):
+            return snapshot
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('guild_id') != guild_id:
+            return snapshot
+        snapshot.projects = data.get('projects', {})
+        snapshot.roles_messages = data.get('roles_messages', [])
+        snapshot.roles_digest = data.get('roles_digest')
+        return snapshot
+
+    def save(self):
+        atomic_write(self.path, json.dumps({
+            'guild_id': self.guild_id,
+            'projects': self.projects,
+            'roles_messages': self.roles_messages,
+            'roles_digest': self.roles_digest,
+        }, indent=2))
@@ -0,0 +1,146 @@
+#!/bin/env python
+
+# Build the client-side search of the projects page: an inverted index of
+# the words of the projects, sharded by their first letter, and one page
+# per project that Jekyll renders into its details (see
+# _layouts/project_details.html). The page only loads the shards of the
+# words being typed, and the details of a project when it is opened.
+# Rerun it after editing _data/projects.yml, the search misses the projects
+# added since and their details fall back to the copy inlined in the page.
+# Run from the repository root: python scripts/build_search_index.py
+import argparse
+import json
+import os
+import re
+import unicodedata
+
+from data_cache import load_projects
+from records_io import atomic_write
+
+# Define the projects data file and the directory served to the page
+PROJECTS_PATH = './_data/projects.yml'
+SEARCH_DIR = './search'
+
+# Define the fields indexed, with the weight of a match in each
+FIELD_WEIGHTS = {
+    'title': 4,
+    'categories': 3,
+    'skills': 2,
+    'hub': 2,
+    'details': 1,
+}
+
+# Define the number of leading characters used to shard the index
+PREFIX_LENGTH = 1
+
+# Words too common to be worth indexing
+STOPWORDS = frozenset('''
+    a an and are as at be but by can for from has have how in into is it its
+    of on or our that the their this to we will with you your
+'''.split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    # Lowercase words without accents; the page tokenizes its queries the
+    # same way
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [t for t in TOKEN_RE.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+def field_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ' '.join(field_text(v) for v in value)
+    if isinstance(value, dict):
+        return ' '.join(field_text(v) for v in value.values())
+    return str(value)
+
+
+def build_index(projects):
+    # token -> {issue: score}
+    index = {}
+    for project in projects:
+        issue = project.get('issue')
+        if issue is None:
+            continue
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(field_text(project.get(field))):
+                postings = index.setdefault(token, {})
+                postings[issue] = postings.get(issue, 0) + weight
+    return index
+
+
+def shard_index(index, prefix_length=PREFIX_LENGTH):
+    # {prefix: {token: [[issue, score], ...]}}, postings by decreasing score
+    shards = {}
+    for token in sorted(index):
+        postings = sorted(index[token].items(), key=lambda p: (-p[1], p[0]))
+        shards.setdefault(token[:prefix_length], {})[token] = [list(p) for p in postings]
+    return shards
+
+
+def dumps(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, sort_keys=True)
+
+
+def write_if_changed(path, text):
+    # Leave unchanged files alone so that Jekyll only rebuilds what changed
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    atomic_write(path, text)
+    return True
+
+
+def build_search_index(projects_path=PROJECTS_PATH, search_dir=SEARCH_DIR, prefix_length=PREFIX_LENGTH):
+    projects = [p for p in load_projects(projects_path) if p.get('issue') is not None]
+    shards = shard_index(build_index(projects), prefix_length)
+
+    files = {
+        os.path.join(search_dir, 'meta.json'): dumps({
+            'prefix_length': prefix_length,
+            'shards': sorted(shards),
+            'projects': len(projects),
+            'stopwords': sorted(STOPWORDS),
+        }),
+    }
+    for prefix, tokens in shards.items():
+        files[os.path.join(search_dir, 'index', f'{prefix}.json')] = dumps(tokens)
+    for project in projects:
+        files[os.path.join(search_dir, 'projects', f"{project['issue']}.html")] = (
+            f"---\nlayout: project_details\nissue: {project['issue']}\n---\n")
+
+    written = sum(write_if_changed(path, text) for path, text in files.items())
+
+    # Remove the shards and projects that are gone
+    removed = 0
+    for sub, extension in (('index', '.json'), ('projects', '.html')):
+        directory = os.path.join(search_dir, sub)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            path = os.path.join(directory, name)
+            if name.endswith(extension) and path not in files:
+                os.remove(path)
+                removed += 1
+
+    size = sum(len(text.encode()) for path, text in files.items() if path.endswith('.json'))
+    print(f'{len(projects)} projects, {sum(len(t) for t in shards.values())} words in {len(shards)} shards '
+          f'({size / 1024:.1f} KiB), {written} files written, {removed} removed')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the search index of the projects page')
+    parser.add_argument('--projects', default=PROJECTS_PATH, help='projects data file')
+    parser.add_argument('--output', default=SEARCH_DIR, help='directory served to the page')
+    parser.add_argument('--prefix-length', type=int, default=PREFIX_LENGTH, help='characters of the shard prefixes')
+    args = parser.parse_args(argv)
+
+    build_search_index(args.projects, args.output, args.prefix_length)
+
+
+if __name__ == '__main__':
+    main()
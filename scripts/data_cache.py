@@ -0,0 +1,85 @@
+# Shared loader of the project data files (_data/projects.yml,
+# _data/discord_projects.json). Each file is parsed once: the records and
+# their lookup indexes are pickled in .cache/data, keyed by the path,
+# modification time and size of the file, and kept in memory for the
+# lifetime of the process. The returned data is shared, treat it as
+# read-only.
+import hashlib
+import os
+import pickle
+
+from records_io import atomic_write, iter_records
+
+# Define the directory of the compiled data files
+CACHE_DIR = './.cache/data'
+
+# Bump when the layout of ProjectData changes, to ignore older caches
+CACHE_VERSION = 2
+
+_loaded = {}
+
+
+class ProjectData:
+    # The records of a data file and their indexes. The issue records name
+    # the channel and issue `chatchannel` and `issue_number`, projects.yml
+    # names them `shortname` and `issue`; both are indexed.
+    def __init__(self, records):
+        self.records = records
+        self.by_chatchannel = {}
+        self.by_issue_number = {}
+        for record in records:
+            channel = record.get('chatchannel') or record.get('shortname')
+            if channel is not None:
+                self.by_chatchannel.setdefault(channel, record)
+            number = record.get('issue_number', record.get('issue'))
+            if number is not None:
+                self.by_issue_number.setdefault(number, record)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f'{os.path.basename(path)}-{key}.pickle')
+
+
+def load_projects(path, cache_dir=CACHE_DIR):
+    # Records and indexes of a data file, from memory, from the compiled
+    # cache, or parsed when the file changed
+    stamp = file_stamp(path)
+    key = os.path.abspath(path)
+    loaded = _loaded.get(key)
+    if loaded is not None and loaded[0] == stamp:
+        return loaded[1]
+
+    compiled = cache_path(path, cache_dir)
+    data = None
+    try:
+        with open(compiled, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['version'] == CACHE_VERSION and cached['path'] == key and cached['stamp'] == stamp:
+            data = cached['data']
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError):
+        pass
+
+    if data is None:
+        data = ProjectData(list(iter_records(path)))
+        try:
+            atomic_write(compiled, pickle.dumps(
+                {'version': CACHE_VERSION, 'path': key, 'stamp': stamp, 'data': data},
+                protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            # The cache is an optimisation, e.g. on a read-only checkout
+            pass
+
+    _loaded[key] = (stamp, data)
+    return data
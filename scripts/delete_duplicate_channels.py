@@ -1,17 +1,36 @@
+import argparse
+import asyncio
 import discord
 import logging
+import time
 from dotenv import load_dotenv
 import os
 
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
+from aio_utils import gather_bounded
+
 logger = logging.getLogger('discord')
 
+# Define the categories of the project channels created by the bot; the
+# duplicates are only searched there and among uncategorized channels
+PROJECT_CATEGORIES = ('Projects', 'Projects-text')
+
+# Define how many channels are deleted at the same time
+DELETE_CONCURRENCY = 5
+
+# Define how many times a failed deletion is retried, and the first backoff
+DELETE_RETRIES = 3
+DELETE_BACKOFF = 1.0
+
 class ProjectsClient(discord.Client):
-    def __init__(self, guild_id: int, *args, **kwargs):
+    def __init__(self, guild_id: int, *args, dry_run=False, duplicates=False,
+                 concurrency=DELETE_CONCURRENCY, **kwargs):
         intents = discord.Intents.default()
         super().__init__(intents=intents, *args, **kwargs)
         self._guild_id = guild_id
+        self.dry_run = dry_run
+        self.duplicates = duplicates
+        self.concurrency = concurrency
+        self.stats = {'deleted': 0, 'missing': 0, 'failed': 0, 'retries': 0}
 
     async def on_ready(self):
         logger.info(f'Logged in as {self.user} (ID: {self.user.id})')
@@ -21,18 +40,110 @@ class ProjectsClient(discord.Client):
             await self.delete_non_entrance_channels(guild)
         await self.close()
 
+    def plan_deletions(self, guild):
+        # Text and voice channels to delete: the uncategorized ones other
+        # than the entrance and, optionally, duplicates found by name in the
+        # project categories. Other categories, such as the archive of
+        # removed projects, are left alone.
+        channels = [
+            c for c in guild.channels
+            if str(c.type) in ('text', 'voice') and c.name.lower() != "entrance"
+        ]
+
+        plan = {}
+        for channel in channels:
+            if channel.category is None:
+                plan[channel.id] = (channel, 'uncategorized')
+
+        if self.duplicates:
+            by_name = {}
+            for channel in channels:
+                if channel.category is not None and channel.category.name not in PROJECT_CATEGORIES:
+                    continue
+                by_name.setdefault((str(channel.type), channel.name), []).append(channel)
+
+            for same_name in by_name.values():
+                if len(same_name) < 2:
+                    continue
+                # Keep the oldest categorized channel of each name
+                same_name.sort(key=lambda c: (c.category is None, c.id))
+                for channel in same_name[1:]:
+                    plan.setdefault(channel.id, (channel, f'duplicate of {same_name[0].id}'))
+
+        return list(plan.values())
+
+    async def delete_channel(self, channel):
+        backoff = DELETE_BACKOFF
+        for attempt in range(DELETE_RETRIES + 1):
+            try:
+                await channel.delete()
+                logger.info(f'Deleted channel: {channel.name} (ID: {channel.id})')
+                self.stats['deleted'] += 1
+                return
+            except discord.NotFound:
+                self.stats['missing'] += 1
+                return
+            except discord.HTTPException as e:
+                # discord.py already waits out the rate-limit buckets; retry
+                # what is left of 429s and server errors with a backoff
+                if attempt == DELETE_RETRIES or (e.status != 429 and e.status < 500):
+                    logger.error(f'Failed to delete channel {channel.name} (ID: {channel.id}): {e}')
+                    self.stats['failed'] += 1
+                    return
+                self.stats['retries'] += 1
+                await asyncio.sleep(backoff)
+                backoff *= 2
+
+    async def delete_channels(self, plan):
+        start = time.perf_counter()
+        await gather_bounded(
+            (self.delete_channel(channel) for channel, _ in plan),
+            self.concurrency
+        )
+        elapsed = time.perf_counter() - start
+
+        rate = self.stats['deleted'] / elapsed if elapsed else 0
+        logger.info(
+            f"Deleted {self.stats['deleted']} channels in {elapsed:.1f}s ({rate:.1f}/s), "
+            f"{self.stats['retries']} retries, {self.stats['failed']} failed, "
+            f"{self.stats['missing']} already gone"
+        )
+
     async def delete_non_entrance_channels(self, guild: discord.Guild):
-        for channel in guild.channels:
-            if isinstance(channel, (discord.TextChannel, discord.VoiceChannel)):
-                if channel.name.lower() != "entrance" and channel.category is None:
-                    logger.info(f'Deleting channel: {channel.name} (ID: {channel.id})')
-                    await channel.delete()
+        plan = self.plan_deletions(guild)
+        for channel, reason in plan:
+            category = channel.category.name if channel.category else '-'
+            logger.info(f'{"Would delete" if self.dry_run else "Deleting"} {channel.type} channel: '
+                        f'{category}/{channel.name} (ID: {channel.id}), {reason}')
+
+        if self.dry_run:
+            logger.info(f'Dry run: {len(plan)} channels would be deleted.')
+            return
+
+        await self.delete_channels(plan)
         logger.info('Finished deleting non-entrance channels.')
 
-if __name__ == '__main__':
+def main(argv=None):
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
     load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Delete uncategorized and duplicate Discord channels')
+    parser.add_argument('--dry-run', action='store_true', help='only print the channels that would be deleted')
+    parser.add_argument('--duplicates', action='store_true', help='also delete channels duplicated by name in the project categories')
+    parser.add_argument('--concurrency', type=int, default=DELETE_CONCURRENCY, help='channels deleted at the same time')
+    args = parser.parse_args(argv)
+
     guild_id = int(os.getenv('DISCORD_GUILD_ID', ''))
     token = os.getenv('DISCORD_TOKEN', '')
 
-    client = ProjectsClient(guild_id)
-    client.run(token)
\ No newline at end of file
+    client = ProjectsClient(
+        guild_id,
+        dry_run=args.dry_run,
+        duplicates=args.duplicates,
+        concurrency=args.concurrency
+    )
+    client.run(token)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
+import argparse
 import os
 from projects_bot import ProjectsClient
 
-if __name__ == '__main__':
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create the Discord roles and channels of the projects')
+    parser.parse_args(argv)
+
     from dotenv import load_dotenv
     load_dotenv()
 
@@ -16,3 +20,6 @@ if __name__ == '__main__':
         sleep_mode=False
     )
     client.run(token)
+
+if __name__ == '__main__':
+    main()
@@ -1,139 +1,180 @@
 #!/bin/env python
 
 # Import necessary modules
+import argparse
 import os
-import re
-import requests
-import yaml
-import json
+from urllib.parse import quote
+
+from github_api import GH_API_URL, iter_pages, make_session
+from github_graphql import GH_GRAPHQL_URL, iter_issues as iter_graphql_issues
+from issue_cache import CACHE_PATH, IssueCache
+from issue_dump import CHUNK_SIZE, parse_dump
+from issue_form import IssueForm
+from records_io import FORMATS, iter_records, write_records
+
+# Define the repository and issue labels
+REPO = 'ohbm/hackathon2024'
+ISSUE_LABEL = ':rocket: HackTrack Project'
+ISSUE_READY_LABEL = ':mag: Review: Good to go ✅'
+
+# Define the issue form template of the projects
+ISSUE_FORM_PATH = '.github/ISSUE_TEMPLATE/brainhack-hacktrack-project.yml'
+
+# Define the output file for the filtered issue information
+OUTPUT_PATH = './_data/discord_projects.json'
+
+# Define the APIs the issues can be fetched from
+BACKENDS = ('rest', 'graphql')
+
+# Parse a single issue into the project record, or None if it is skipped
+def parse_issue(issue, form):
+
+    # Skip issues that do not have the "Good to go" label or are not open
+    if ISSUE_READY_LABEL not in [i['name'] for i in issue["labels"]]:
+        return None
+    if issue["state"] != "open":
+        return None
+
+    try:
+        # Extract the values for each field in the issue body
+        issue_info = form.parse(issue["body"])
+
+        # Remove the primary hub from the list of other hubs
+        if issue_info['hub'] in issue_info['otherhub']:
+            issue_info['otherhub'].remove(issue_info['hub'])
+
+        # Add issue link and number to the issue info
+        issue_info['issue_link'] = issue["html_url"]
+        issue_info['issue_number'] = issue["number"]
+        return issue_info
+
+    # Skip issues that raise exceptions
+    except:
+        return None
+
+# Fetch the changed issues from the REST API into the cache
+def fetch_rest_issues(session, cache, form):
+
+    # Define issue filters for the API request. Incremental runs ask for
+    # issues of any state updated since the last sync, so that issues
+    # closed in the meantime are dropped from the cache as well.
+    ISSUE_FILTER = f'labels={ISSUE_LABEL}&per_page=100'
+    ISSUE_FILTER = f'per_page=100'
+    if cache.since is not None:
+        ISSUE_FILTER += f'&state=all&since={quote(cache.since)}'
+
+    # Construct the API URL with the filters, GH_API_URL allows pointing
+    # the fetcher at a local stand-in of the GitHub API
+    API_URL = os.environ.get('GH_API_URL', GH_API_URL)
+    URL = f'{API_URL}/repos/{REPO}/issues?{ISSUE_FILTER}'
+
+    # Fetch every page of issues over one pooled session with conditional
+    # requests; issues are streamed into the loop below as each page arrives
+    cache.use_query(URL)
+    pages = set()
+    complete = False
+    for page, res in iter_pages(session, URL, etags=cache.etags):
+        pages.add(str(page))
+
+        # Pages that did not change since the last sync have nothing new
+        if res.status_code == 304:
+            continue
+        complete = complete or page == 1
+
+        etag = res.headers.get('ETag')
+
+        # Only parse the issues that changed since they were cached
+        for issue in res.json():
+            if cache.is_fresh(issue):
+                continue
+            cache.update(issue, parse_issue(issue, form), etag)
+
+    # Unless a 304 on the first page ended the listing early, every page
+    # was requested; drop the ETags of the pages past its end
+    if complete:
+        cache.retain_pages(pages)
+
+# Fetch the ready projects from the GraphQL API into the cache
+def fetch_graphql_issues(session, cache, form):
+
+    # GitHub only returns the open issues with the "Good to go" label, with
+    # the fields parse_issue reads. The listing is complete, so cached
+    # issues missing from it were closed or unlabeled and are dropped.
+    # GH_GRAPHQL_URL allows pointing the fetcher at a local stand-in.
+    URL = os.environ.get('GH_GRAPHQL_URL', GH_GRAPHQL_URL)
+    issues = iter_graphql_issues(session, REPO, labels=[ISSUE_READY_LABEL], states=['open'], url=URL)
+
+    numbers = []
+    for issue in issues:
+        numbers.append(issue['number'])
+        if not cache.is_fresh(issue):
+            cache.update(issue, parse_issue(issue, form))
+    cache.retain(numbers)
 
 # Define the main function to fetch GitHub issues
-def fetch_gh_issues():
+def fetch_gh_issues(full=False, backend='rest', cache_path=CACHE_PATH, output_path=OUTPUT_PATH, format='json', indent=2):
 
     # Get GitHub authentication token from environment variable
     GH_AUTH = os.environ['GH_AUTH']
 
-    # Define the repository and issue labels
-    REPO = 'ohbm/hackathon2024'
-    ISSUE_LABEL = ':rocket: HackTrack Project'
-    ISSUE_READY_LABEL = ':mag: Review: Good to go ✅'
-    
-    # Define issue filters for the API request
-    ISSUE_FILTER = f'labels={ISSUE_LABEL}&per_page=100'
-    ISSUE_FILTER = f'per_page=100'
-    
-    # Construct the API URL with the authentication token and filters
-    URL = f'https://{GH_AUTH}@api.github.com/repos/{REPO}/issues?{ISSUE_FILTER}'
+    # Load the cache of previously fetched issues; a full resync starts
+    # from an empty cache
+    cache = IssueCache(cache_path) if full else IssueCache.load(cache_path)
 
     # Load the issue form template from a YAML file
-    with open('.github/ISSUE_TEMPLATE/brainhack-hacktrack-project.yml') as f:
-        issue_form = yaml.safe_load(f)
+    form = IssueForm.from_file(ISSUE_FORM_PATH)
 
-    # Get the fields from the issue form template, excluding markdown fields
-    fields = issue_form['body']
-    fields = [f for f in fields if f['type'] != 'markdown']
+    # Keep the current records to tell whether anything changed
+    previous_records = cache.records()
 
-    # Make a request to the GitHub API to fetch issues
-    res = requests.get(URL)
-    issues = res.json()
+    session = make_session(GH_AUTH)
+    if backend == 'graphql':
+        fetch_graphql_issues(session, cache, form)
+    else:
+        fetch_rest_issues(session, cache, form)
 
-    # Initialize a list to store the filtered issue information
-    issues_list = []
+    issues_list = cache.records()
+    cache.save()
 
-    # Loop through each issue
-    for issue in issues:
-        
-        # Skip issues that do not have the "Good to go" label or are not open
-        if ISSUE_READY_LABEL not in [i['name'] for i in issue["labels"]]:
-            continue
-        if issue["state"] != "open":
-            continue
+    # Skip rewriting the JSON file when nothing changed
+    if issues_list == previous_records and os.path.exists(output_path):
+        print('No changes since the last sync')
+        return
 
-        try:
-            # Extract and process the issue body text
-            body = issue["body"]
-            lines = [l.strip() for l in body.replace('\r\n', '\n').split('\n')]
-
-            field_ordering = []
-
-            # Determine the order of fields in the issue body
-            for field in fields:
-                field_start = None
-                field_label = field['attributes']['label']
-
-                for li, line in enumerate(lines):
-                    is_line_title = line.startswith(f'### {field_label}')
-                    if field_start is None and is_line_title:
-                        field_start = li
-
-                field_ordering += [(field, field_start)]
-            field_ordering = list(sorted(field_ordering, key=lambda f: f[1]))
-
-            issue_info = {}
-
-            # Extract the values for each field in the issue
-            field_bounds = zip(field_ordering, field_ordering[1:] + [(None, None)])
-            for (field, i), (_, ni) in field_bounds:
-                field_id = field['id']
-                field_label = field['attributes']['label']
-
-                if i is None:
-                    issue_info[field_id] = None
-                    continue
-
-                field_value = '\n'.join(filter(None, lines[i+1:ni]))
-                
-                # Remove HTML comments from the field value
-                field_value = re.sub(
-                    r'<!--.*?-->', '', field_value,
-                    flags=re.DOTALL
-                )
-                field_value = field_value.strip()
-
-                # Handle default "No response" values
-                if field_value == '_No response_':
-                    field_value = None
-
-                # Process checkbox fields
-                if field['type'] == 'checkboxes':
-                    field_options_labels = [
-                        o['label'].strip()
-                        for o in field['attributes']['options']
-                    ]
-                    field_selected_options = []
-                    field_options_value = field_value.split('\n')
-                    for l in field_options_value:
-                        if l[6:] not in field_options_labels:
-                            continue
-                        if l.startswith('- [X] '):
-                            field_selected_options.append(l[6:])
-                        if l.startswith('- [x] '):
-                            field_selected_options.append(l[6:])
-
-                    field_value = field_selected_options
-
-                issue_info[field_id] = field_value
-
-            # Remove the primary hub from the list of other hubs
-            if issue_info['hub'] in issue_info['otherhub']:
-                issue_info['otherhub'].remove(issue_info['hub'])
-
-            # Add issue link and number to the issue info
-            issue_info['issue_link'] = issue["html_url"]
-            issue_info['issue_number'] = issue["number"]
-            issues_list.append(issue_info)
-        
-        # Skip issues that raise exceptions
-        except:
-            pass
-
-    # Write the filtered issue information to a JSON file
-    with open('./_data/discord_projects.json', 'w') as f:
-        json.dump(issues_list, f, indent=2)
+    # Write the filtered issue information to the output file
+    write_records(output_path, issues_list, format=format, indent=indent)
 
-# Run the fetch_gh_issues function if the script is executed directly
-if __name__ == '__main__':
+# Parse an exported issues dump instead of calling the GitHub API
+def parse_gh_dump(dump_path, output_path=OUTPUT_PATH, workers=None, chunk_size=CHUNK_SIZE, format='json', indent=2):
+    issues_list = parse_dump(
+        parse_issue, ISSUE_FORM_PATH, iter_records(dump_path),
+        workers=workers, chunk_size=chunk_size
+    )
+
+    # Write the filtered issue information to the output file
+    write_records(output_path, issues_list, format=format, indent=indent)
+
+def main(argv=None):
     from dotenv import load_dotenv
     load_dotenv()
 
-    fetch_gh_issues()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Fetch HackTrack projects from GitHub issues')
+    parser.add_argument('--full', action='store_true', help='ignore the issue cache and resync every issue')
+    parser.add_argument('--backend', choices=BACKENDS, default='rest', help='GitHub API to fetch the issues from')
+    parser.add_argument('--dump', help='parse an exported issues dump (JSON array or NDJSON) instead of calling the API')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='output file')
+    parser.add_argument('--format', choices=FORMATS, default='json', help='output format, NDJSON suits large archives')
+    parser.add_argument('--compact', action='store_true', help='write JSON without indentation')
+    parser.add_argument('--workers', type=int, help='number of worker processes of the --dump mode')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='issues sent to a worker at once')
+    args = parser.parse_args(argv)
+
+    output = dict(output_path=args.output, format=args.format, indent=None if args.compact else 2)
+    if args.dump:
+        parse_gh_dump(args.dump, workers=args.workers, chunk_size=args.chunk_size, **output)
+    else:
+        fetch_gh_issues(full=args.full, backend=args.backend, **output)
+
+# Run the fetch_gh_issues function if the script is executed directly
+if __name__ == '__main__':
+    main()
@@ -1,138 +1,117 @@
 #!/bin/env python
 
 # Import necessary modules
+import argparse
 import os
-import re
-import requests
-import yaml
-import json
+
+from github_api import GH_API_URL, iter_issues, make_session
+from issue_dump import CHUNK_SIZE, parse_dump
+from issue_form import IssueForm
+from records_io import FORMATS, iter_records, write_records
+
+# Define the repository and issue label
+REPO = 'ohbm/hackathon2024'
+ISSUE_LABEL = 'Proceedings'
+# ISSUE_READY_LABEL = 'Good to go'  # Commented out, not used in this script
+
+# Define the issue form template of the proceedings
+ISSUE_FORM_PATH = '.github/ISSUE_TEMPLATE/hackathon-proceedings.yml'
+
+# Define the output file for the filtered issue information
+OUTPUT_PATH = './public/proceedings.json'
+
+# Parse a single issue into the proceedings record, or None if it is skipped
+def parse_issue(issue, form):
+
+    print("looking for issue", issue['url'])
+
+    # Skip issues that are not in the 'open' state
+    if issue["state"] != "open":
+        return None
+
+    print('passed')
+
+    try:
+        # Extract the values for each field in the issue body
+        issue_info = form.parse(issue["body"])
+
+        # Add issue link and number to the issue info
+        issue_info['issue_link'] = issue["html_url"]
+        issue_info['issue_number'] = issue["number"]
+        return issue_info
+
+    # Handle and log any exceptions that occur during processing
+    except Exception as e:
+        print("error in issue", issue['url'])
+        print(e)
+        raise e
 
 # Define the main function to fetch GitHub issues
-def fetch_gh_issues():
-    
+def fetch_gh_issues(output_path=OUTPUT_PATH, format='json', indent=2):
+
     # Get GitHub authentication token from environment variable
     GH_AUTH = os.environ['GH_AUTH']
 
-    # Define the repository and issue label
-    REPO = 'ohbm/hackathon2024'
-    ISSUE_LABEL = 'Proceedings'
-    # ISSUE_READY_LABEL = 'Good to go'  # Commented out, not used in this script
-
     # Define issue filter for the API request
     ISSUE_FILTER = f'labels={ISSUE_LABEL}&per_page=100'
 
-    # Construct the API URL with the authentication token and filters
-    URL = f'https://{GH_AUTH}@api.github.com/repos/{REPO}/issues?{ISSUE_FILTER}'
+    # Construct the API URL with the filters, GH_API_URL allows pointing
+    # the fetcher at a local stand-in of the GitHub API
+    API_URL = os.environ.get('GH_API_URL', GH_API_URL)
+    URL = f'{API_URL}/repos/{REPO}/issues?{ISSUE_FILTER}'
 
     # Load the issue form template from a YAML file
-    with open('.github/ISSUE_TEMPLATE/hackathon-proceedings.yml') as f:
-        issue_form = yaml.safe_load(f)
-
-    # Get the fields from the issue form template, excluding markdown fields
-    fields = issue_form['body']
-    fields = [f for f in fields if f['type'] != 'markdown']
+    form = IssueForm.from_file(ISSUE_FORM_PATH)
 
-    # Make a request to the GitHub API to fetch issues
-    res = requests.get(URL)
-    issues = res.json()
+    # Fetch every page of issues over one pooled session; issues are
+    # streamed into the loop below as each page arrives
+    session = make_session(GH_AUTH)
+    issues = iter_issues(session, URL)
 
     # Initialize a list to store the filtered issue information
     issues_list = []
 
     # Loop through each issue
     for issue in issues:
-        
-        print("looking for issue", issue['url'])
-
-        # Skip issues that are not in the 'open' state
-        if issue["state"] != "open":
-            continue
-
-        print('passed')
-
-        try:
-            # Extract and process the issue body text
-            body = issue["body"]
-            lines = [l.strip() for l in body.replace('\r\n', '\n').split('\n')]
-
-            field_ordering = []
-
-            # Determine the order of fields in the issue body
-            for field in fields:
-                field_start = None
-                field_label = field['attributes']['label']
-
-                for li, line in enumerate(lines):
-                    is_line_title = line.startswith(f'### {field_label}')
-                    if field_start is None and is_line_title:
-                        field_start = li
-
-                field_ordering += [(field, field_start)]
-            field_ordering = list(sorted(field_ordering, key=lambda f: f[1]))
-
-            issue_info = {}
-
-            # Extract the values for each field in the issue
-            field_bounds = zip(field_ordering, field_ordering[1:] + [(None, None)])
-            for (field, i), (_, ni) in field_bounds:
-                field_id = field['id']
-                field_label = field['attributes']['label']
-
-                if i is None:
-                    issue_info[field_id] = None
-                    continue
-
-                field_value = '\n'.join(filter(None, lines[i+1:ni]))
-                
-                # Remove HTML comments from the field value
-                field_value = re.sub(
-                    r'<!--.*?-->', '', field_value,
-                    flags=re.DOTALL
-                )
-                field_value = field_value.strip()
-
-                # Handle default "No response" values
-                if field_value == '_No response_':
-                    field_value = None
-
-                # Process checkbox fields
-                if field['type'] == 'checkboxes':
-                    field_options_labels = [
-                        o['label'].strip()
-                        for o in field['attributes']['options']
-                    ]
-                    field_selected_options = []
-                    field_options_value = field_value.split('\n')
-                    for l in field_options_value:
-                        if l[6:] not in field_options_labels:
-                            continue
-                        if l.startswith('- [X] '):
-                            field_selected_options.append(l[6:])
-                        if l.startswith('- [x] '):
-                            field_selected_options.append(l[6:])
-
-                    field_value = field_selected_options
-
-                issue_info[field_id] = field_value
-
-            # Add issue link and number to the issue info
-            issue_info['issue_link'] = issue["html_url"]
-            issue_info['issue_number'] = issue["number"]
+        issue_info = parse_issue(issue, form)
+        if issue_info is not None:
             issues_list.append(issue_info)
 
-        # Handle and log any exceptions that occur during processing
-        except Exception as e:
-            print("error in issue", issue['url'])
-            print(e)
-            raise e
+    # Pages arrive in completion order, keep the output in the API order
+    issues_list.sort(key=lambda i: i['issue_number'], reverse=True)
 
-    # Write the filtered issue information to a JSON file
-    with open('./public/proceedings.json', 'w') as f:
-        json.dump(issues_list, f, indent=2)
+    # Write the filtered issue information to the output file
+    write_records(output_path, issues_list, format=format, indent=indent)
 
-# Run the fetch_gh_issues function if the script is executed directly
-if __name__ == '__main__':
+# Parse an exported issues dump instead of calling the GitHub API
+def parse_gh_dump(dump_path, output_path=OUTPUT_PATH, workers=None, chunk_size=CHUNK_SIZE, format='json', indent=2):
+    issues_list = parse_dump(
+        parse_issue, ISSUE_FORM_PATH, iter_records(dump_path),
+        workers=workers, chunk_size=chunk_size
+    )
+
+    # Write the filtered issue information to the output file
+    write_records(output_path, issues_list, format=format, indent=indent)
+
+def main(argv=None):
     from dotenv import load_dotenv
     load_dotenv()
 
-    fetch_gh_issues()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Fetch hackathon proceedings from GitHub issues')
+    parser.add_argument('--dump', help='parse an exported issues dump (JSON array or NDJSON) instead of calling the API')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='output file')
+    parser.add_argument('--format', choices=FORMATS, default='json', help='output format, NDJSON suits large archives')
+    parser.add_argument('--compact', action='store_true', help='write JSON without indentation')
+    parser.add_argument('--workers', type=int, help='number of worker processes of the --dump mode')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='issues sent to a worker at once')
+    args = parser.parse_args(argv)
+
+    output = dict(output_path=args.output, format=args.format, indent=None if args.compact else 2)
+    if args.dump:
+        parse_gh_dump(args.dump, workers=args.workers, chunk_size=args.chunk_size, **output)
+    else:
+        fetch_gh_issues(**output)
+
+# Run the fetch_gh_issues function if the script is executed directly
+if __name__ == '__main__':
+    main()
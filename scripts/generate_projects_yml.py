@@ -0,0 +1,237 @@
+#!/bin/env python
+
+# Update the `projectlist` of _data/projects.yml from the issue records
+# written by fetch_gh_issues.py. The file is edited as text: only the
+# fields generated from an issue are rewritten, and only when that issue
+# changed since the last run, so hand-edited fields (image, categories,
+# leads, ...), comments and the order of the projects are left alone.
+# Run from the repository root: python scripts/generate_projects_yml.py
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+from records_io import atomic_write, iter_records
+
+# Define the issue records read and the data file updated
+RECORDS_PATH = './_data/discord_projects.json'
+PROJECTS_YML_PATH = './_data/projects.yml'
+
+# Define the content hashes of the issues written by the last run
+HASHES_PATH = './.cache/projects_yml.json'
+
+# Define the image of new projects, until one is picked by hand
+DEFAULT_IMAGE = 'hands.jpg'
+
+# Define the fields generated from the issues, in the order they are
+# added to a project; the other fields are maintained by hand
+GENERATED_FIELDS = ('title', 'link', 'details', 'issue', 'shortname', 'hub', 'otherhub')
+
+# Define the fields of new projects
+NEW_PROJECT_FIELDS = ('title', 'link', 'image', 'details', 'issue', 'categories', 'leads',
+                      'shortname', 'hub', 'otherhub')
+
+# Matches the first line of a project, and the first line of its fields
+ENTRY_RE = re.compile(r'^  - ')
+FIELD_RE = re.compile(r'^(?:  - |    )([A-Za-z_][\w-]*):')
+
+
+def project_fields(record):
+    # The generated fields of the project of an issue record; the details
+    # end with a newline, like the `details: |` blocks of the file
+    details = (record.get('goals') or '').replace('\r\n', '\n').strip()
+    details = details + '\n' if details else ''
+    return {
+        'title': record['title'],
+        'link': record.get('link'),
+        'details': details,
+        'issue': record['issue_number'],
+        'shortname': record.get('chatchannel'),
+        'hub': record.get('hub'),
+        'otherhub': record.get('otherhub') or [],
+    }
+
+
+def fields_hash(fields):
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def emit_scalar(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    # JSON strings are valid double-quoted YAML scalars
+    return json.dumps(value, ensure_ascii=False)
+
+
+def emit_value(key, value, indent):
+    # Lines of `key: value` at `indent`, in the layout of projects.yml
+    pad = ' ' * indent
+    if isinstance(value, str) and ('\n' in value or key == 'details') and value \
+            and not value[0].isspace() and not value.endswith('\n\n'):
+        chomp = '' if value.endswith('\n') else '-'
+        body = [(pad + '  ' + line).rstrip() + '\n' for line in value.rstrip('\n').split('\n')]
+        return [f'{pad}{key}: |{chomp}\n'] + body
+    if isinstance(value, list):
+        if not value:
+            return [f'{pad}{key}: []\n']
+        lines = [f'{pad}{key}:\n']
+        for item in value:
+            if isinstance(item, dict):
+                item_lines = []
+                for k, v in item.items():
+                    item_lines += emit_value(k, v, indent + 4)
+                item_lines[0] = pad + '  - ' + item_lines[0][len(pad) + 4:]
+                lines += item_lines
+            else:
+                lines.append(f'{pad}  - {emit_scalar(item)}\n')
+        return lines
+    if isinstance(value, dict):
+        lines = [f'{pad}{key}:\n']
+        for k, v in value.items():
+            lines += emit_value(k, v, indent + 2)
+        return lines
+    return [f'{pad}{key}: {emit_scalar(value)}'.rstrip() + '\n']
+
+
+def emit_field(key, value, first=False):
+    lines = emit_value(key, value, 4)
+    if first:
+        lines[0] = '  - ' + lines[0][4:]
+    return lines
+
+
+class Entry:
+    # One project of the projectlist, as the text of each of its fields
+    def __init__(self, lines):
+        self.fields = []
+        self.tail = []
+        # Blank lines after the last field separate the projects
+        end = len(lines)
+        while end > 0 and not lines[end - 1].strip():
+            end -= 1
+        self.tail = lines[end:]
+        for line in lines[:end]:
+            match = FIELD_RE.match(line)
+            if match:
+                self.fields.append([match.group(1), [line]])
+            elif self.fields:
+                self.fields[-1][1].append(line)
+        self.data = (yaml.safe_load(''.join(lines[:end])) or [{}])[0]
+
+    @classmethod
+    def new(cls, fields):
+        entry = cls.__new__(cls)
+        entry.fields = []
+        entry.tail = ['\n', '\n']
+        entry.data = {}
+        for key in NEW_PROJECT_FIELDS:
+            value = fields.get(key, [] if key in ('categories', 'leads') else None)
+            entry.set(key, value)
+        return entry
+
+    def set(self, key, value):
+        for field in self.fields:
+            if field[0] == key:
+                field[1] = emit_field(key, value, first=field is self.fields[0])
+                break
+        else:
+            self.fields.append([key, emit_field(key, value, first=not self.fields)])
+        self.data[key] = value
+
+    def text(self):
+        return ''.join(line for _, lines in self.fields for line in lines) + ''.join(self.tail)
+
+
+def split_projects(text):
+    # Split the file into the text before the projects, the projects, and
+    # the text after them
+    lines = text.splitlines(keepends=True)
+    start = next((i + 1 for i, line in enumerate(lines) if line.startswith('projectlist:')), None)
+    if start is None:
+        raise ValueError('No projectlist in the projects file')
+
+    # The list ends at the first line back at the first column
+    end = next((i for i in range(start, len(lines))
+                if lines[i].strip() and not lines[i][0].isspace()), len(lines))
+
+    starts = [i for i in range(start, end) if ENTRY_RE.match(lines[i])]
+    head = lines[:starts[0]] if starts else lines[:end]
+    entries = [Entry(lines[s:e]) for s, e in zip(starts, starts[1:] + [end])]
+    return head, entries, lines[end:]
+
+
+def generate_projects_yml(records_path=RECORDS_PATH, yml_path=PROJECTS_YML_PATH,
+                          hashes_path=HASHES_PATH, force=False):
+    with open(yml_path) as f:
+        text = f.read()
+    head, entries, rest = split_projects(text)
+    by_issue = {entry.data.get('issue'): entry for entry in entries}
+
+    hashes = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path) as f:
+            hashes = json.load(f)
+
+    added = updated = 0
+    new_hashes = dict(hashes)
+    for record in iter_records(records_path):
+        fields = project_fields(record)
+        key = str(fields['issue'])
+        digest = fields_hash(fields)
+        new_hashes[key] = digest
+        if hashes.get(key) == digest and not force:
+            continue
+
+        entry = by_issue.get(fields['issue'])
+        if entry is None:
+            entry = Entry.new(dict(fields, image=DEFAULT_IMAGE))
+            if entries and not entries[-1].tail:
+                entries[-1].tail = ['\n', '\n']
+            entries.append(entry)
+            by_issue[fields['issue']] = entry
+            added += 1
+            continue
+
+        # A project written by hand before its issue was tracked only gets
+        # its missing fields; afterwards the generated fields follow the
+        # issue
+        adopt = key not in hashes and not force
+        changed = False
+        for name in GENERATED_FIELDS:
+            if adopt and name in entry.data:
+                continue
+            if entry.data.get(name) != fields[name] or name not in entry.data:
+                entry.set(name, fields[name])
+                changed = True
+        updated += changed
+
+    new_text = ''.join(head) + ''.join(entry.text() for entry in entries) + ''.join(rest)
+    if new_text != text:
+        atomic_write(yml_path, new_text)
+
+    if new_hashes != hashes:
+        atomic_write(hashes_path, json.dumps(new_hashes, indent=2, sort_keys=True))
+
+    print(f'{added} projects added, {updated} updated, {len(entries) - added - updated} unchanged')
+    return added, updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Update _data/projects.yml from the fetched issues')
+    parser.add_argument('--records', default=RECORDS_PATH, help='issue records written by fetch_gh_issues.py')
+    parser.add_argument('--output', default=PROJECTS_YML_PATH, help='projects data file to update')
+    parser.add_argument('--force', action='store_true', help='rewrite the generated fields of every project')
+    args = parser.parse_args(argv)
+
+    generate_projects_yml(args.records, args.output, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
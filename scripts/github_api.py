@@ -0,0 +1,108 @@
+# Helpers to fetch paginated listings from the GitHub REST API
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Base URL of the GitHub REST API, overridable to point at a local stand-in
+GH_API_URL = 'https://api.github.com'
+
+# Number of pages fetched at the same time once the page count is known
+MAX_WORKERS = 8
+
+# Matches one `<url>; rel="name"` entry of a Link header
+LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+
+def make_session(auth=None, max_workers=MAX_WORKERS):
+    # Build a pooled HTTP session shared by every page request
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept'] = 'application/vnd.github+json'
+
+    # GH_AUTH is used as the user-info part of the URL ("user:token" or
+    # "token"), so send it the same way as HTTP basic auth
+    if auth:
+        user, _, password = auth.partition(':')
+        session.auth = (user, password)
+    return session
+
+
+def parse_link_header(header):
+    # Map each rel of a Link header to its URL
+    if not header:
+        return {}
+    return {rel: url for url, rel in LINK_RE.findall(header)}
+
+
+def page_url(url, page):
+    # Return the URL with its `page` query parameter replaced
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query['page'] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def page_number(url):
+    return int(parse_qs(urlparse(url).query)['page'][0])
+
+
+def fetch_page(session, url, etags=None, key=None):
+    # Send a conditional request when the page ETag is known; a 304 reply
+    # does not count against the rate limit. New ETags are recorded back
+    # into `etags`, keyed by `key` (the page URL by default).
+    key = url if key is None else key
+    headers = {}
+    if etags is not None and key in etags:
+        headers['If-None-Match'] = etags[key]
+    res = session.get(url, headers=headers)
+    if res.status_code == 304:
+        return res
+    res.raise_for_status()
+    if etags is not None and 'ETag' in res.headers:
+        etags[key] = res.headers['ETag']
+    return res
+
+
+def iter_pages(session, url, max_workers=MAX_WORKERS, etags=None):
+    # Yield (page number, response) for every page of a listing, as soon
+    # as each page arrives. Pages after the first are fetched concurrently
+    # when the Link header tells how many there are; otherwise the
+    # rel="next" links are followed one after the other. A first page
+    # answered with 304 Not Modified ends the listing. ETags are keyed by
+    # page number, as a string so that they survive a JSON round trip.
+    res = fetch_page(session, url, etags, '1')
+    yield 1, res
+
+    links = parse_link_header(res.headers.get('Link'))
+    if res.status_code == 304 or 'next' not in links:
+        return
+
+    if 'last' not in links:
+        page = 1
+        while 'next' in links:
+            page += 1
+            res = fetch_page(session, links['next'], etags, str(page))
+            yield page, res
+            links = parse_link_header(res.headers.get('Link'))
+        return
+
+    first = page_number(links['next'])
+    last = page_number(links['last'])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_page, session, page_url(links['next'], page), etags, str(page)): page
+            for page in range(first, last + 1)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def iter_issues(session, url, max_workers=MAX_WORKERS):
+    # Yield every item of a paginated issue listing, page by page
+    for _, res in iter_pages(session, url, max_workers=max_workers):
+        yield from res.json()
@@ -0,0 +1,88 @@
+# Helpers to fetch issues from the GitHub GraphQL API. Only the fields the
+# issue parsers use are requested, the label and state filters are applied
+# by GitHub, and pages are followed by cursor, so a sync downloads the
+# ready projects only instead of every issue and pull request of the
+# repository.
+
+# Endpoint of the GitHub GraphQL API, overridable to point at a local stand-in
+GH_GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# Largest page size accepted by the GraphQL API
+PAGE_SIZE = 100
+
+# Labels returned for each issue; the parsers only look for one of them
+LABELS_PER_ISSUE = 50
+
+ISSUES_QUERY = '''
+query($owner: String!, $name: String!, $labels: [String!], $states: [IssueState!],
+      $since: DateTime, $first: Int!, $after: String, $labelCount: Int!) {
+  repository(owner: $owner, name: $name) {
+    issues(labels: $labels, states: $states, filterBy: {since: $since},
+           first: $first, after: $after, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        url
+        state
+        updatedAt
+        body
+        labels(first: $labelCount) { nodes { name } }
+      }
+    }
+  }
+}
+'''
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def run_query(session, url, query, variables):
+    # POST a query and return its data; GraphQL reports errors in the body
+    # of a 200 reply
+    res = session.post(url, json={'query': query, 'variables': variables})
+    res.raise_for_status()
+    payload = res.json()
+    if payload.get('errors'):
+        raise GraphQLError('; '.join(e.get('message', str(e)) for e in payload['errors']))
+    return payload['data']
+
+
+def rest_issue(node):
+    # Shape an issue node like an issue of the REST API, as far as the
+    # parsers and the issue cache read it
+    return {
+        'number': node['number'],
+        'html_url': node['url'],
+        'state': node['state'].lower(),
+        'updated_at': node['updatedAt'],
+        'labels': [{'name': label['name']} for label in node['labels']['nodes']],
+        'body': node['body'],
+    }
+
+
+def iter_issues(session, repo, labels=None, states=None, since=None, url=GH_GRAPHQL_URL, page_size=PAGE_SIZE):
+    # Yield the issues of a repository matching the labels (any of them)
+    # and states, as REST-shaped dicts, following the pages by cursor
+    owner, name = repo.split('/')
+    variables = {
+        'owner': owner,
+        'name': name,
+        'labels': labels,
+        'states': [s.upper() for s in states] if states else None,
+        'since': since,
+        'first': page_size,
+        'after': None,
+        'labelCount': LABELS_PER_ISSUE,
+    }
+    while True:
+        data = run_query(session, url, ISSUES_QUERY, variables)
+        if data['repository'] is None:
+            raise GraphQLError(f'Repository {repo} not found')
+        issues = data['repository']['issues']
+        for node in issues['nodes']:
+            yield rest_issue(node)
+        if not issues['pageInfo']['hasNextPage']:
+            return
+        variables['after'] = issues['pageInfo']['endCursor']
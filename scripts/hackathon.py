@@ -0,0 +1,50 @@
+#!/bin/env python
+
+# Single entry point of the hackathon scripts. A subcommand only imports
+# its own module, and the modules only read their configuration when they
+# run, so light cron jobs such as pitch-order do not pay for importing the
+# Discord, Twitter or GitHub stacks.
+# Run from the repository root: python scripts/hackathon.py <command> [options]
+import argparse
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Define the subcommands, with the module whose main() they run
+COMMANDS = {
+    'fetch-issues': ('fetch_gh_issues', 'fetch the HackTrack projects from the GitHub issues'),
+    'fetch-proceedings': ('fetch_gh_proceedings', 'fetch the hackathon proceedings from the GitHub issues'),
+    'generate-projects': ('generate_projects_yml', 'update _data/projects.yml from the fetched issues'),
+    'images': ('project_images', 'download the project images and write their resized variants'),
+    'search-index': ('build_search_index', 'build the search index and project details pages'),
+    'bot': ('projects_bot', 'run the Discord projects bot'),
+    'ensure': ('ensure_discord', 'create the Discord roles and channels of the projects'),
+    'cleanup': ('delete_duplicate_channels', 'delete uncategorized and duplicate Discord channels'),
+    'tweet': ('tweet', 'tweet the projects not announced yet'),
+    'pitch-order': ('random_project_pitch', 'write the pitch order of the projects'),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='hackathon',
+        description='Hackathon website and Discord tooling',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f'  {name:<20}{help}' for name, (_, help) in COMMANDS.items()),
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help='command to run, see below')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='options of the command, see <command> --help')
+    args = parser.parse_args(argv)
+
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+
+    # Show the command in the usage line of its own parser
+    sys.argv[0] = f'hackathon {args.command}'
+    return module.main(args.args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# On-disk cache of fetched issues, used for incremental syncs
+import json
+import os
+
+from records_io import atomic_write
+
+# Default location of the cache, relative to the repository root
+CACHE_PATH = './.cache/gh_issues.json'
+
+
+class IssueCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        # Latest `updated_at` seen, sent as `since=` on the next run
+        self.since = None
+        # Listing URL the ETags belong to, and the ETag of each of its pages
+        # by page number, sent as `If-None-Match`
+        self.query = None
+        self.etags = {}
+        # Issue number -> {'updated_at': ..., 'etag': ..., 'record': ...}
+        self.issues = {}
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        cache = cls(path)
+        if not os.path.exists(path):
+            return cache
+        with open(path) as f:
+            data = json.load(f)
+        cache.since = data.get('since')
+        cache.query = data.get('query')
+        cache.etags = data.get('etags', {})
+        cache.issues = {int(n): i for n, i in data.get('issues', {}).items()}
+        return cache
+
+    def is_fresh(self, issue):
+        # Whether the cached entry already reflects this version of the issue
+        cached = self.issues.get(issue['number'])
+        return cached is not None and cached['updated_at'] == issue['updated_at']
+
+    def update(self, issue, record, etag=None):
+        self.issues[issue['number']] = {
+            'updated_at': issue['updated_at'],
+            'etag': etag,
+            'record': record,
+        }
+        if self.since is None or issue['updated_at'] > self.since:
+            self.since = issue['updated_at']
+
+    def use_query(self, url):
+        # The ETags of another listing URL (e.g. an older since=) are never
+        # sent again, drop them
+        if url != self.query:
+            self.query = url
+            self.etags = {}
+
+    def retain_pages(self, pages):
+        # Drop the ETags of pages past the end of the listing
+        self.etags = {page: etag for page, etag in self.etags.items() if page in pages}
+
+    def retain(self, numbers):
+        # Drop the issues missing from a complete listing
+        for number in set(self.issues) - set(numbers):
+            del self.issues[number]
+
+    def records(self):
+        # Parsed records of the cached issues, in the API order
+        return [
+            self.issues[n]['record']
+            for n in sorted(self.issues, reverse=True)
+            if self.issues[n]['record'] is not None
+        ]
+
+    def save(self):
+        atomic_write(self.path, json.dumps({
+            'since': self.since,
+            'query': self.query,
+            'etags': self.etags,
+            'issues': self.issues,
+        }))
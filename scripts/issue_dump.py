@@ -0,0 +1,44 @@
+# Offline parsing of exported issue dumps across a process pool
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from issue_form import IssueForm
+
+# Number of issues sent to a worker process at once
+CHUNK_SIZE = 200
+
+# Issue form loaded once in each worker process
+_form = None
+
+
+def iter_chunks(items, size):
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def _init_worker(form_path):
+    global _form
+    _form = IssueForm.from_file(form_path)
+
+
+def _parse_chunk(parse_issue, issues):
+    return [parse_issue(issue, _form) for issue in issues]
+
+
+def parse_dump(parse_issue, form_path, issues, workers=None, chunk_size=CHUNK_SIZE):
+    # Parse the issues with `parse_issue(issue, form)` in a pool of worker
+    # processes, each loading the issue form once. Skipped issues are
+    # dropped and the records are ordered by issue number, newest first.
+    workers = workers or os.cpu_count()
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(form_path,)) as executor:
+        parse = partial(_parse_chunk, parse_issue)
+        for chunk in executor.map(parse, iter_chunks(issues, chunk_size)):
+            records.extend(r for r in chunk if r is not None)
+
+    # Dumps can span several repositories, break ties with the issue link
+    records.sort(key=lambda r: (r['issue_number'], r['issue_link']), reverse=True)
+    return records
@@ -0,0 +1,115 @@
+# Parser for the bodies of issues submitted through a GitHub issue form
+import re
+
+import yaml
+
+# Matches HTML comments left in the body by the form template
+COMMENT_RE = re.compile(r'<!--.*?-->', flags=re.DOTALL)
+
+# Prefixes of the checked options of a checkboxes field
+CHECKED_PREFIXES = ('- [X] ', '- [x] ')
+
+# Value GitHub renders for optional fields left empty
+NO_RESPONSE = '_No response_'
+
+
+class IssueForm:
+    def __init__(self, form):
+        # Keep the form fields, excluding markdown fields
+        self.fields = [f for f in form['body'] if f['type'] != 'markdown']
+
+        # Compile the heading -> field lookup table; GitHub renders each
+        # field of the form as a `### <label>` heading in the issue body
+        self.headings = {}
+        for field in self.fields:
+            self.headings.setdefault(f"### {field['attributes']['label']}", field)
+
+        # Labels ordered from the longest, for headings with trailing text
+        self.labels = sorted(self.headings, key=len, reverse=True)
+
+        # Precompute the option labels of the checkbox fields
+        self.options = {
+            field['id']: {o['label'].strip() for o in field['attributes']['options']}
+            for field in self.fields
+            if field['type'] == 'checkboxes'
+        }
+
+        # Fields that must be present in every body
+        self.required = [
+            field['id'] for field in self.fields
+            if field.get('validations', {}).get('required')
+        ]
+
+    @classmethod
+    def from_file(cls, path):
+        # Load the issue form template from a YAML file
+        with open(path) as f:
+            return cls(yaml.safe_load(f))
+
+    def match_heading(self, line):
+        # Resolve a `### ` line to its field, or None for other headings
+        field = self.headings.get(line)
+        if field is not None:
+            return field
+        for heading in self.labels:
+            if line.startswith(heading):
+                return self.headings[heading]
+        return None
+
+    def tokenize(self, body):
+        # Split the body into (field, lines) sections in a single pass over
+        # its lines. Text before the first field, headings that are not
+        # fields and repeated headings stay part of the current section.
+        sections = {}
+        current = None
+        for line in body.replace('\r\n', '\n').split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('### '):
+                field = self.match_heading(line)
+                if field is not None and field['id'] not in sections:
+                    current = sections[field['id']] = []
+                    continue
+            if current is not None:
+                current.append(line)
+        return sections
+
+    def parse_value(self, field, lines):
+        field_value = '\n'.join(lines)
+
+        # Remove HTML comments from the field value
+        if '<!--' in field_value:
+            field_value = COMMENT_RE.sub('', field_value)
+        field_value = field_value.strip()
+
+        # Handle default "No response" values
+        if field_value == NO_RESPONSE:
+            field_value = None
+
+        # Process checkbox fields
+        if field['type'] == 'checkboxes':
+            options = self.options[field['id']]
+            field_value = [
+                l[6:] for l in (field_value or '').split('\n')
+                if l.startswith(CHECKED_PREFIXES) and l[6:] in options
+            ]
+
+        return field_value
+
+    def parse(self, body):
+        # Extract the value of each field of the form from an issue body
+        sections = self.tokenize(body)
+
+        missing = [f for f in self.required if f not in sections]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+        issue_info = {}
+        for field in self.fields:
+            lines = sections.get(field['id'])
+            if lines is None:
+                issue_info[field['id']] = None
+                continue
+            issue_info[field['id']] = self.parse_value(field, lines)
+        return issue_info
@@ -0,0 +1,292 @@
+#!/bin/env python
+
+# Download the `website-image` of every project, keep them in a
+# content-addressed cache, and write resized WebP and PNG variants plus the
+# manifest used by _includes/projects.html for srcset and lazy loading.
+# Run from the repository root: python scripts/project_images.py
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from records_io import atomic_write, iter_records
+
+# Define the projects file and the manifest written for the site
+PROJECTS_PATH = './_data/discord_projects.json'
+MANIFEST_PATH = './_data/project_images.json'
+
+# Define the downloaded images cache, keyed by content hash
+CACHE_DIR = './.cache/images'
+
+# Define where the resized variants are written, and their widths
+VARIANTS_DIR = './img/hackathon/resized'
+WIDTHS = (320, 640, 1280)
+
+# Define how many images are downloaded at the same time
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_TIMEOUT = 30
+
+# Define the largest image downloaded, in bytes
+MAX_IMAGE_BYTES = 20 * 2**20
+DOWNLOAD_CHUNK_SIZE = 64 * 2**10
+
+# Matches the URL of a markdown image, e.g. ![alt](https://...)
+MARKDOWN_IMAGE_RE = re.compile(r'!\[[^\]]*\]\(([^)\s]+)\)')
+
+# Matches GitHub file pages and Google Drive sharing links
+GITHUB_BLOB_RE = re.compile(r'^https://github\.com/([^/]+)/([^/]+)/blob/(.+?)(\?.*)?$')
+DRIVE_FILE_RE = re.compile(r'^https://drive\.google\.com/file/d/([^/]+)')
+
+
+def image_url(value):
+    # Turn the form value into a URL serving the image itself
+    if not value:
+        return None
+    value = value.strip()
+    match = MARKDOWN_IMAGE_RE.search(value)
+    if match:
+        value = match.group(1)
+    match = GITHUB_BLOB_RE.match(value)
+    if match:
+        owner, repo, path, _ = match.groups()
+        return f'https://raw.githubusercontent.com/{owner}/{repo}/{path}'
+    match = DRIVE_FILE_RE.match(value)
+    if match:
+        return f'https://drive.google.com/uc?export=download&id={match.group(1)}'
+    return value
+
+
+def local_path(url, local_dir=None):
+    # Path of a file:// URL or of a local file, None for remote URLs. The
+    # image URLs come from the issues, so local files are only read with an
+    # explicit --local-dir, and only from inside it.
+    parsed = urlparse(url)
+    if parsed.scheme in ('http', 'https'):
+        return None
+    if parsed.scheme not in ('file', ''):
+        raise ValueError(f'Unsupported image URL scheme: {url}')
+    if local_dir is None:
+        raise ValueError(f'Local image without --local-dir: {url}')
+    root = os.path.realpath(local_dir)
+    path = unquote(parsed.path) if parsed.scheme == 'file' else url
+    path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f'Local image outside of {local_dir}: {url}')
+    return path
+
+
+class ImageCache:
+    # Downloaded images stored under their sha256, and the validators of
+    # each URL so that unchanged images are not downloaded again
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.urls = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.urls = json.load(f)
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def read(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+    def store(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.has(digest):
+            atomic_write(self.path(digest), data)
+        return digest
+
+    def save(self):
+        data = json.dumps(self.urls, indent=2, sort_keys=True).encode()
+        atomic_write(self.index_path, data)
+
+
+def make_session(max_workers=DOWNLOAD_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_image(session, cache, url, local_dir=None):
+    # Return the sha256 of the image, downloading it only when the server
+    # reports a change
+    path = local_path(url, local_dir)
+    if path is not None:
+        with open(path, 'rb') as f:
+            return cache.store(f.read()), 'local'
+
+    cached = cache.urls.get(url)
+    headers = {}
+    if cached and cache.has(cached['sha256']):
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    # The URLs come from the issues: only read images, and stop reading
+    # past MAX_IMAGE_BYTES
+    with session.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT, stream=True) as response:
+        if response.status_code == 304:
+            return cached['sha256'], 'not modified'
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith('image/'):
+            raise ValueError(f'Not an image ({content_type or "no content type"}): {url}')
+        if int(response.headers.get('Content-Length') or 0) > MAX_IMAGE_BYTES:
+            raise ValueError(f'Image larger than {MAX_IMAGE_BYTES} bytes: {url}')
+
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_IMAGE_BYTES:
+                raise ValueError(f'Image larger than {MAX_IMAGE_BYTES} bytes: {url}')
+            chunks.append(chunk)
+
+    digest = cache.store(b''.join(chunks))
+    cache.urls[url] = {
+        'sha256': digest,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    return digest, 'downloaded'
+
+
+def variant_path(digest, width, extension, variants_dir=VARIANTS_DIR):
+    return os.path.join(variants_dir, f'{digest[:16]}-{width}.{extension}')
+
+
+def site_path(path):
+    # Path of a written file as served by the site
+    return os.path.relpath(path, '.').replace(os.sep, '/')
+
+
+def render_variants(cache, digest, widths=WIDTHS, variants_dir=VARIANTS_DIR):
+    # Write the resized variants of an image, unless they already exist,
+    # and return its manifest entry
+    from PIL import Image, UnidentifiedImageError
+
+    data = cache.read(digest)
+    try:
+        image = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        if b'<svg' not in data[:4096]:
+            raise
+        # SVGs from the issues may carry scripts, so they are never served
+        # from the site; the page links to them where they are hosted
+        return {'sha256': digest, 'svg': True}
+
+    width, height = image.size
+
+    sizes = sorted({min(w, width) for w in widths})
+    entry = {'sha256': digest, 'width': width, 'height': height, 'webp': [], 'png': []}
+    for w in sizes:
+        h = max(1, round(height * w / width))
+        resized = None
+        for extension, options in (('webp', {'quality': 80, 'method': 6}), ('png', {'optimize': True})):
+            path = variant_path(digest, w, extension, variants_dir)
+            if not os.path.exists(path):
+                if resized is None:
+                    # Animated images are reduced to their first frame
+                    image.seek(0)
+                    mode = 'RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB'
+                    resized = image.convert(mode)
+                    if w != width:
+                        resized = resized.resize((w, h), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, format=extension.upper(), **options)
+                atomic_write(path, buffer.getvalue())
+            entry[extension].append({'width': w, 'path': site_path(path)})
+    return entry
+
+
+def process_project(session, cache, project, widths, variants_dir, local_dir=None):
+    url = image_url(project.get('website-image'))
+    if not url:
+        return None, 'no image'
+    digest, status = fetch_image(session, cache, url, local_dir)
+    entry = render_variants(cache, digest, widths, variants_dir)
+    if entry.get('svg'):
+        if local_path(url, local_dir) is not None:
+            raise ValueError(f'SVG images are only linked from their remote URL: {url}')
+        entry = {'sha256': digest, 'remote': url}
+    entry['source'] = url
+    return entry, status
+
+
+def build_manifest(projects_path=PROJECTS_PATH, manifest_path=MANIFEST_PATH, cache_dir=CACHE_DIR,
+                   variants_dir=VARIANTS_DIR, widths=WIDTHS, workers=DOWNLOAD_WORKERS, local_dir=None):
+    cache = ImageCache(cache_dir)
+    session = make_session(workers)
+    projects = list(iter_records(projects_path))
+
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (project, executor.submit(process_project, session, cache, project, widths, variants_dir, local_dir))
+            for project in projects
+        ]
+
+        manifest = {}
+        for project, future in futures:
+            key = str(project['issue_number'])
+            try:
+                entry, status = future.result()
+            except Exception as e:
+                # Keep the entry of the previous run when an image can't be
+                # fetched or decoded
+                print(f"Issue {key}: failed to process the image: {e}")
+                if key in previous:
+                    manifest[key] = previous[key]
+                continue
+            print(f"Issue {key}: {status}")
+            if entry is not None:
+                manifest[key] = entry
+
+    cache.save()
+
+    if manifest == previous:
+        print("Image manifest unchanged")
+        return manifest
+    data = (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode()
+    atomic_write(manifest_path, data)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download the project images and write their resized variants')
+    parser.add_argument('--projects', default=PROJECTS_PATH, help='projects file with the website-image URLs')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest written for the site')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='downloaded images cache')
+    parser.add_argument('--variants-dir', default=VARIANTS_DIR, help='directory of the resized variants')
+    parser.add_argument('--widths', type=int, nargs='+', default=list(WIDTHS), help='widths of the variants')
+    parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS, help='images downloaded at the same time')
+    parser.add_argument('--local-dir', help='read local image paths and file:// URLs from this directory (offline runs)')
+    args = parser.parse_args(argv)
+
+    build_manifest(args.projects, args.manifest, args.cache_dir, args.variants_dir,
+                   tuple(args.widths), args.workers, args.local_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,63 @@
+import argparse
 import asyncio
+from collections import Counter
+import hashlib
 import json
 import discord
 from discord.ext import commands
 import logging
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
-# Load environment variables from the .env file
-load_dotenv()
-
-# Retrieve the environment variables from the .env file
-discord_token = os.getenv('DISCORD_TOKEN')
-guild_id = int(os.getenv('DISCORD_GUILD_ID'))
-roles_channel_id = int(os.getenv('DISCORD_ROLES_CHANNEL'))
+from aio_utils import gather_bounded
+from bot_metrics import Registry, RateLimitHandler, monitor_loop_lag
+from bot_snapshot import SNAPSHOT_PATH, BotSnapshot
+from data_cache import load_projects
 
 # Use the 'discord' logger for all logging
 logger = logging.getLogger('discord')
 logger.setLevel(logging.INFO)
 
-# Define the emoji list for project roles
+# Define the file listing the projects, written by fetch_gh_issues.py
+PROJECTS_PATH = '_data/discord_projects.json'
+
+# Define how many projects are set up at the same time
+PROVISION_CONCURRENCY = 8
+
+# Define how long reaction role changes of a member are batched, in seconds
+ROLES_DEBOUNCE = 1.0
+
+# Define how many reactions are added to the roles messages at the same time
+REACTIONS_CONCURRENCY = 4
+
+# Define how often the projects file is checked for changes, in seconds
+RELOAD_INTERVAL = 30
+
+# Define the category receiving the channels of removed projects
+ARCHIVE_CATEGORY = 'Projects-archive'
+
+# Define the message cache size of the lean profile
+LEAN_MAX_MESSAGES = 100
+
+# Define how often the memory footprint is logged, in seconds (0 disables it)
+MEMORY_REPORT_INTERVAL = 600
+
+# Define the address of the metrics endpoint (the port is set with
+# DISCORD_METRICS_PORT, the endpoint is off otherwise)
+METRICS_HOST = '127.0.0.1'
+
+# Define how often the event loop lag is measured, in seconds
+LOOP_LAG_INTERVAL = 1.0
+
+# Define the default number of projects per roles message, and Discord's
+# limit of distinct reactions on a message
+PROJECTS_PER_MESSAGE = 10
+MAX_REACTIONS_PER_MESSAGE = 20
+
+# Define the emoji list for project roles. An emoji is only reused once
+# every emoji was assigned, and never twice in the same roles message
 EMOJI_PROJECT_ROLES = list(
     "🐁🐂🐄🐇🐈🐉🐊🐋🐌"
     "🐍🐎🐏🐐🐑🐒🐓🐕🦛"
@@ -26,6 +65,14 @@ EMOJI_PROJECT_ROLES = list(
     "🦖🐡🐢🐦🐧🦜🐩🐪🐬"
     "🐿🕊🦜🦂🦃🦆🦇🦈🦒"
     "🦉🦋🦎🦔🦦🦩🍀🌸🌻"
+    "🌵🌲🌴🌷🌹🌺🌼🍁🍂"
+    "🍄🌰🍎🍊🍋🍌🍉🍇🍓"
+    "🍒🍑🍍🥝🥥🥑🍆🥕🌽"
+    "🥦🥜🍞🥐🥨🧀🥚🥞🍔"
+    "🍟🍕🌭🥪🌮🌯🥗🍿🧁"
+    "🍩🍪🎂🍰🍫🍬🍭🍯🎈"
+    "🎉🎨🎭🎲🎯🎳🎮🎸🎺"
+    "🎻🥁🏀🏈🏐🏓🚀🚲🛶"
 )
 
 # Define the template for project role messages
@@ -56,6 +103,32 @@ class Project:
         self.text = None
         self.role = None
 
+    def restore(self, entry):
+        # Resolve the role and channels saved in the bot snapshot from the
+        # guild cache; entries that drifted (deleted, renamed or moved) are
+        # left unset and resolved again by setup()
+        role = self.guild.get_role(entry.get('role'))
+        if role is not None and role.name == f'proj-{self.key}':
+            self.role = role
+
+        voice = self.guild.get_channel(entry.get('voice'))
+        if voice is not None and voice.name == self.key and voice.category == self.client.voice_category:
+            self.voice = voice
+
+        text = self.guild.get_channel(entry.get('text'))
+        if text is not None and text.name == self.key and text.category == self.client.text_category:
+            self.text = text
+
+        return self.role is not None and self.voice is not None and self.text is not None
+
+    def snapshot(self):
+        return {
+            'role': self.role.id,
+            'voice': self.voice.id,
+            'text': self.text.id,
+            'emoji': self.emoji,
+        }
+
     async def setup(self):
         # Create the project role, channels, and set permissions
         await self.ensure_role()
@@ -67,29 +140,57 @@ class Project:
         if self.role is not None:
             return
         # Check if the role already exists
-        self.role = discord.utils.get(self.guild.roles, name=f'proj-{self.key}')
+        self.role = self.client.get_role_named(f'proj-{self.key}')
         if self.role:
             logger.info(f"Role already exists: {self.role.name}")
         else:
             # Create the role if it does not exist
             self.role = await self.guild.create_role(name=f'proj-{self.key}', mentionable=True)
+            self.client.api_calls['create_role'] += 1
+            self.client.index_role(self.role)
             logger.info(f"Created role: {self.role.name}")
 
+    def channel_overwrites(self):
+        # Define permissions for the channels
+        overwrites = {
+            self.guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            self.client.cached_roles['muted']: discord.PermissionOverwrite(view_channel=False),
+            self.client.cached_roles['staff']: discord.PermissionOverwrite(view_channel=True),
+            self.role: discord.PermissionOverwrite(view_channel=True),
+        }
+        # Skip roles missing from the guild, e.g. no "muted" role
+        overwrites.pop(None, None)
+        return overwrites
+
     async def ensure_channels(self):
         # Check if the voice and text channels already exist in the Projects category
-        self.voice = discord.utils.get(self.client.voice_category.voice_channels, name=self.key)
-        self.text = discord.utils.get(self.client.text_category.text_channels, name=self.key)
+        if self.voice is None:
+            self.voice = self.client.get_channel_named(self.client.voice_category, 'voice', self.key)
+        if self.text is None:
+            self.text = self.client.get_channel_named(self.client.text_category, 'text', self.key)
+
+        if self.voice is not None and self.text is not None:
+            logger.info(f"Channels for project {self.title} already exist.")
+            return
 
-        if self.voice is None and self.text is None:
+        # Create the missing channels with their permissions already set
+        overwrites = self.channel_overwrites()
+
+        if self.voice is None:
             # Create the voice channel in the Projects category
-            self.voice = await self.guild.create_voice_channel(name=self.key, category=self.client.voice_category)
+            self.voice = await self.guild.create_voice_channel(
+                name=self.key, category=self.client.voice_category, overwrites=overwrites)
+            self.client.api_calls['create_channel'] += 1
+            self.client.index_channel(self.voice)
             logger.info(f"Created voice channel: {self.voice.name} (ID: {self.voice.id})")
 
+        if self.text is None:
             # Create the text channel in the Projects-text category
-            self.text = await self.guild.create_text_channel(name=self.key, category=self.client.text_category)
+            self.text = await self.guild.create_text_channel(
+                name=self.key, category=self.client.text_category, overwrites=overwrites)
+            self.client.api_calls['create_channel'] += 1
+            self.client.index_channel(self.text)
             logger.info(f"Created text channel: {self.text.name} (ID: {self.text.id})")
-        else:
-            logger.info(f"Channels for project {self.title} already exist.")
 
     async def ensure_channel_permissions(self):
         # Ensure that both channels exist
@@ -97,26 +198,90 @@ class Project:
             logger.info(f"Voice or text channel for project {self.title} is not set.")
             return
 
-        # Define permissions for the channels
-        overwrites = {
-            self.guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            self.client.cached_roles['muted']: discord.PermissionOverwrite(view_channel=False),
-            self.client.cached_roles['staff']: discord.PermissionOverwrite(view_channel=True),
-            self.role: discord.PermissionOverwrite(view_channel=True),
-        }
-        # Apply the permissions to the voice and text channels
-        await self.voice.edit(overwrites=overwrites)
-        await self.text.edit(overwrites=overwrites)
-        logger.info(f"Permissions set for voice and text channels of project: {self.title}")
+        # Apply the permissions to the voice and text channels, only editing
+        # the channels whose current overwrites differ
+        overwrites = self.channel_overwrites()
+        edited = False
+        for channel in (self.voice, self.text):
+            if channel.overwrites == overwrites:
+                self.client.api_calls_skipped['edit_channel'] += 1
+                continue
+            await channel.edit(overwrites=overwrites)
+            self.client.api_calls['edit_channel'] += 1
+            edited = True
+        if edited:
+            logger.info(f"Permissions set for voice and text channels of project: {self.title}")
+
+def rss_bytes():
+    # Current resident set size, the peak one where /proc is missing, or
+    # None where the resource module is missing too (Windows)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def projects_file_stamp():
+    # Modification time and size of the projects file, None if missing
+    try:
+        stat = os.stat(PROJECTS_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def assign_emoji(i, used):
+    # Emoji of the i-th project, or the first one not used yet
+    emoji = EMOJI_PROJECT_ROLES[i % len(EMOJI_PROJECT_ROLES)]
+    if emoji in used:
+        emoji = next((e for e in EMOJI_PROJECT_ROLES if e not in used), emoji)
+    return emoji
+
+def roles_digest(rendered):
+    # Digest of the rendered roles messages, saved in the bot snapshot
+    data = [
+        (content, [e.to_dict() for e in embeds], [p.emoji for p in projects])
+        for content, embeds, projects in rendered
+    ]
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+def embed_key(embed):
+    # The parts of an embed the bot sets; Discord trims the description
+    color = embed.color.value if embed.color is not None else None
+    return embed.title, (embed.description or '').strip(), color
+
+def same_message(message, content, embeds):
+    # Whether a sent message already shows the rendered content and embeds
+    return ((message.content or '').strip() == (content or '').strip()
+            and [embed_key(e) for e in message.embeds] == [embed_key(e) for e in embeds])
 
 # Define the main bot class
 class ProjectsClient(commands.Bot):
-    def __init__(self, guild_id, roles_channel_id, *args, **kwargs):
+    def __init__(self, guild_id, roles_channel_id, *args, archive_removed=False, lean=False,
+                 memory_report_interval=MEMORY_REPORT_INTERVAL, metrics_port=None,
+                 projects_per_message=PROJECTS_PER_MESSAGE, **kwargs):
         # Define intents to specify which events the bot should listen to
         intents = discord.Intents.default()
         intents.members = True
         intents.presences = True
+
+        # The lean profile only keeps what the role and reaction events
+        # need: no presences, members cached as they are seen instead of
+        # chunking the whole guild at startup, and a small message cache
+        if lean:
+            intents.presences = False
+            kwargs.setdefault('member_cache_flags', discord.MemberCacheFlags(voice=False, joined=True))
+            kwargs.setdefault('chunk_guilds_at_startup', False)
+            kwargs.setdefault('max_messages', LEAN_MAX_MESSAGES)
+
         super().__init__(command_prefix='!', intents=intents, *args, **kwargs)
+        self.memory_report_interval = memory_report_interval
         self._guild_id = guild_id
         self._roles_channel_id = roles_channel_id
         self._guild = None
@@ -128,8 +293,110 @@ class ProjectsClient(commands.Bot):
         self.voice_category = None
         self.text_category = None
         self.cached_roles = {}
-        self.projects_emoji = {}
         self._role_messages_ids = []
+        # Projects of the roles messages keyed by (message id, emoji), so
+        # emojis can repeat across messages
+        self.reaction_roles = {}
+        self.projects_per_message = min(projects_per_message, MAX_REACTIONS_PER_MESSAGE)
+        self.snapshot = BotSnapshot(guild_id, SNAPSHOT_PATH)
+        # Whether projects removed from the projects file get archived
+        self.archive_removed = archive_removed
+        self.archive_category = None
+        # Serialises the setup done in on_ready and by hot reloads
+        self._setup_lock = asyncio.Lock()
+        self._reload_task = None
+        # Reaction role changes waiting to be applied, and the task applying
+        # them, per member
+        self._pending_roles = {}
+        self._role_tasks = {}
+        # Name-keyed indexes of the guild roles, categories and channels,
+        # built in on_ready and kept current from the gateway events
+        self.roles_by_name = {}
+        self.categories_by_name = {}
+        self.channels_by_name = {}
+        # Count the REST calls made and avoided while provisioning
+        self.api_calls = Counter()
+        self.api_calls_skipped = Counter()
+        self.metrics_port = metrics_port
+        self.setup_metrics()
+
+    def setup_metrics(self):
+        self.metrics = Registry()
+        self.api_requests = self.metrics.counter(
+            'discord_api_requests_total', 'Discord REST requests by route and status', ('method', 'route', 'status'))
+        self.api_latency = self.metrics.histogram(
+            'discord_api_request_seconds', 'Discord REST request latency, rate-limit waits included', ('method', 'route'))
+        self.rate_limited = self.metrics.counter(
+            'discord_api_rate_limited_total', '429 responses retried by discord.py')
+        self.project_setup_latency = self.metrics.histogram(
+            'bot_project_setup_seconds', 'Time to set up the role and channels of a project')
+        self.roles_message_latency = self.metrics.histogram(
+            'bot_roles_message_seconds', 'Time to ensure the roles messages')
+        self.reaction_role_latency = self.metrics.histogram(
+            'bot_reaction_role_seconds', 'Time from a reaction event to the role change', ('action',))
+        self.loop_lag = self.metrics.gauge(
+            'bot_event_loop_lag_seconds', 'Last measured event loop lag')
+        self.loop_lag_latency = self.metrics.histogram(
+            'bot_event_loop_lag_distribution_seconds', 'Event loop lag',
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+
+        # Time every REST call made through discord.py, keyed by the route
+        # template so that the ids do not multiply the series
+        request = self.http.request
+
+        async def timed_request(route, **kwargs):
+            status = 'error'
+            try:
+                with self.api_latency.time(method=route.method, route=route.path):
+                    response = await request(route, **kwargs)
+                status = '2xx'
+                return response
+            except discord.HTTPException as e:
+                status = str(e.status)
+                raise
+            finally:
+                self.api_requests.inc(method=route.method, route=route.path, status=status)
+
+        self.http.request = timed_request
+
+        # discord.py only reports the 429s it retries in its logs
+        self._rate_limit_handler = RateLimitHandler(self.rate_limited)
+        logging.getLogger('discord.http').addHandler(self._rate_limit_handler)
+
+    async def close(self):
+        logging.getLogger('discord.http').removeHandler(self._rate_limit_handler)
+        await super().close()
+
+    async def setup_hook(self):
+        # Report the memory footprint on a timer
+        if self.memory_report_interval:
+            self._memory_task = asyncio.create_task(self.report_memory())
+
+        # Measure the event loop lag and serve the metrics
+        self._loop_lag_task = asyncio.create_task(
+            monitor_loop_lag(self.loop_lag, self.loop_lag_latency, LOOP_LAG_INTERVAL))
+        if self.metrics_port:
+            self._metrics_server = await self.metrics.serve(METRICS_HOST, self.metrics_port)
+            logger.info(f"Serving metrics on http://{METRICS_HOST}:{self.metrics_port}/metrics")
+
+    def memory_footprint(self):
+        guild = self._guild or self.get_guild(self._guild_id)
+        rss = rss_bytes()
+        return {
+            'rss_mb': round(rss / 2**20, 1) if rss is not None else None,
+            'guilds': len(self.guilds),
+            'members': len(guild.members) if guild else 0,
+            'users': len(self.users),
+            'roles': len(guild.roles) if guild else 0,
+            'channels': len(guild.channels) if guild else 0,
+            'messages': len(self.cached_messages),
+        }
+
+    async def report_memory(self):
+        while not self.is_closed():
+            footprint = self.memory_footprint()
+            logger.info("Memory: " + ", ".join(f"{k}={v}" for k, v in footprint.items()))
+            await asyncio.sleep(self.memory_report_interval)
 
     async def on_ready(self):
         # Log that the bot is ready and connected
@@ -146,24 +413,32 @@ class ProjectsClient(commands.Bot):
             logger.error("Guild or roles channel not found.")
             return
 
+        # Index the guild roles and channels by name
+        self.index_guild()
+
+        # Load the state saved by the previous run
+        self.snapshot = BotSnapshot.load(self._guild_id, SNAPSHOT_PATH)
+
         # Ensure categories exist for project channels
-        self.voice_category = discord.utils.get(self._guild.categories, name="Projects")
-        self.text_category = discord.utils.get(self._guild.categories, name="Projects-text")
+        self.voice_category = self.categories_by_name.get("Projects")
+        self.text_category = self.categories_by_name.get("Projects-text")
 
         if not self.voice_category:
             self.voice_category = await self._guild.create_category("Projects")
+            self.index_channel(self.voice_category)
         if not self.text_category:
             self.text_category = await self._guild.create_category("Projects-text")
+            self.index_channel(self.text_category)
 
         # Cache project roles
-        for role in self._guild.roles:
-            if role.name.startswith("proj-"):
-                self.projects_roles[role.name] = role
+        for name, role in self.roles_by_name.items():
+            if name.startswith("proj-"):
+                self.projects_roles[name] = role
 
         # Cache specific roles
         self.cached_roles = {
-            'muted': discord.utils.get(self._guild.roles, name='muted'),
-            'staff': discord.utils.get(self._guild.roles, name='Event Staff')
+            'muted': self.roles_by_name.get('muted'),
+            'staff': self.roles_by_name.get('Event Staff')
         }
 
         if not self.cached_roles['staff']:
@@ -171,47 +446,186 @@ class ProjectsClient(commands.Bot):
             return
 
         # Ensure all projects and roles message
-        await self.ensure_projects()
-        await self.ensure_roles_message()
+        async with self._setup_lock:
+            await self.ensure_projects()
+            await self.ensure_roles_message()
+            self.save_snapshot()
+
+        # Watch the projects file for projects approved during the event;
+        # on_ready runs again on reconnects, keep a single watcher
+        if self._reload_task is None:
+            self._reload_task = asyncio.create_task(self.watch_projects())
 
         # Indicate that the bot is now running and listening for events
         logger.info("Bot setup complete. Now listening for events...")
 
+    def index_guild(self):
+        self.roles_by_name = {}
+        self.categories_by_name = {}
+        self.channels_by_name = {}
+        for role in self._guild.roles:
+            self.index_role(role)
+        for channel in self._guild.channels:
+            self.index_channel(channel)
+
+    def index_role(self, role):
+        # Like discord.utils.get, the first role with a given name wins
+        self.roles_by_name.setdefault(role.name, role)
+
+    def unindex_role(self, role):
+        if self.roles_by_name.get(role.name) == role:
+            del self.roles_by_name[role.name]
+            # Fall back to another role with the same name, if any
+            other = discord.utils.get(self._guild.roles, name=role.name)
+            if other is not None and other != role:
+                self.roles_by_name[role.name] = other
+
+    def channel_index(self, channel):
+        # Categories are keyed by name, other channels by their category,
+        # type and name
+        if str(channel.type) == 'category':
+            return self.categories_by_name, channel.name
+        category_id = channel.category.id if channel.category else None
+        return self.channels_by_name, (category_id, str(channel.type), channel.name)
+
+    def index_channel(self, channel):
+        index, key = self.channel_index(channel)
+        index.setdefault(key, channel)
+
+    def unindex_channel(self, channel):
+        index, key = self.channel_index(channel)
+        if index.get(key) == channel:
+            del index[key]
+            # Fall back to another channel with the same key, if any
+            for other in self._guild.channels:
+                if other != channel and self.channel_index(other)[1] == key:
+                    index[key] = other
+                    break
+
+    def get_role_named(self, name):
+        return self.roles_by_name.get(name)
+
+    def get_channel_named(self, category, channel_type, name):
+        return self.channels_by_name.get((category.id, channel_type, name))
+
     async def ensure_projects(self):
-        # Load project data from JSON file
-        with open('_data/discord_projects.json', 'r') as f:
-            projects_data = json.load(f)
+        # Load project data from the JSON (or NDJSON) file, off the event loop
+        projects_data = await asyncio.to_thread(load_projects, PROJECTS_PATH)
 
+        new_projects = {}
+        restored = 0
+        used_emojis = {p.emoji for p in self.projects.values()}
+        used_emojis |= {e['emoji'] for e in self.snapshot.projects.values()}
         for i, data in enumerate(projects_data):
             key = data['chatchannel'].lower()
             # Skip already existing projects
-            if key in self.projects:
+            if key in self.projects or key in new_projects:
                 continue
 
-            # Assign an emoji to each project
-            emoji = EMOJI_PROJECT_ROLES[i % len(EMOJI_PROJECT_ROLES)]
+            # Keep the emoji of the previous run, otherwise assign one in
+            # file order so that the assignment does not depend on which
+            # setup finishes first
+            entry = self.snapshot.projects.get(key)
+            if entry is not None:
+                emoji = entry['emoji']
+            else:
+                emoji = assign_emoji(i, used_emojis)
+                used_emojis.add(emoji)
             project = Project(self, data, emoji)
-            await project.setup()
+            if entry is not None and project.restore(entry):
+                restored += 1
+            new_projects[key] = project
+
+        if self.snapshot.projects:
+            logger.info(f"Restored {restored} projects from the snapshot, "
+                        f"{len(new_projects) - restored} to resolve")
+
+        # Set up independent projects concurrently. discord.py queues the
+        # requests of each rate-limit bucket and waits out 429s, while the
+        # bound keeps projects from piling up on the shared guild buckets.
+        await gather_bounded(
+            (self.setup_project(p) for p in new_projects.values()),
+            PROVISION_CONCURRENCY
+        )
+
+        for project in new_projects.values():
             if project.voice is None or project.text is None:
                 logger.error(f"Failed to create channels for project: {project.title}")
                 continue
             self.voice_channels[project.key] = project.voice
             self.text_channels[project.key] = project.text
             self.projects_roles[f'proj-{project.key}'] = project.role
-            self.projects_emoji[emoji] = project
             self.projects[project.key] = project
 
-    async def ensure_roles_message(self):
-        logger.info("Ensuring roles messages")
-        self._role_messages = []
-        async for message in self.roles_channel.history(limit=10, oldest_first=True):
-            if len(message.embeds) < 1:
-                continue
-            if message.embeds[-1].title != 'Projects':
-                continue
-            self._role_messages.append(message)
-        self._role_messages_ids = [m.id for m in self._role_messages]
+        logger.info(
+            f"Provisioning API calls: {sum(self.api_calls.values())} made {dict(self.api_calls)}, "
+            f"{sum(self.api_calls_skipped.values())} skipped {dict(self.api_calls_skipped)}"
+        )
 
+    async def watch_projects(self):
+        # Poll the modification time of the projects file and reload the
+        # projects when it changes
+        stamp = projects_file_stamp()
+        while not self.is_closed():
+            await asyncio.sleep(RELOAD_INTERVAL)
+            current = projects_file_stamp()
+            if current == stamp:
+                continue
+            stamp = current
+            try:
+                await self.reload_projects()
+            except Exception:
+                logger.exception("Failed to reload the projects")
+
+    async def reload_projects(self):
+        async with self._setup_lock:
+            projects_data = await asyncio.to_thread(load_projects, PROJECTS_PATH)
+            keys = {channel.lower() for channel in projects_data.by_chatchannel}
+            known = set(self.projects)
+
+            # Provision the added projects only
+            await self.ensure_projects()
+            added = set(self.projects) - known
+
+            removed = known - keys
+            if removed and self.archive_removed:
+                for key in sorted(removed):
+                    await self.archive_project(self.projects[key])
+            elif removed:
+                logger.info(f"Projects removed from the file, left in place: {', '.join(sorted(removed))}")
+
+            logger.info(f"Reloaded projects: {len(added)} added, {len(removed)} removed")
+            if added or (removed and self.archive_removed):
+                await self.ensure_roles_message()
+                self.save_snapshot()
+
+    async def archive_project(self, project):
+        # Move the project channels to the archive category and drop the
+        # project from the roles messages; the role is kept
+        if self.archive_category is None:
+            self.archive_category = self.categories_by_name.get(ARCHIVE_CATEGORY)
+        if self.archive_category is None:
+            self.archive_category = await self._guild.create_category(ARCHIVE_CATEGORY)
+            self.index_channel(self.archive_category)
+
+        for channel in (project.voice, project.text):
+            await channel.edit(category=self.archive_category)
+        logger.info(f"Archived project: {project.title}")
+
+        del self.projects[project.key]
+        self.voice_channels.pop(project.key, None)
+        self.text_channels.pop(project.key, None)
+        self.reaction_roles = {k: p for k, p in self.reaction_roles.items() if p is not project}
+
+    async def setup_project(self, project):
+        try:
+            with self.project_setup_latency.time():
+                await project.setup()
+        except discord.HTTPException as e:
+            logger.error(f"Failed to set up project {project.title}: {e}")
+
+    def render_roles_messages(self):
+        # Render the roles messages as (content, embeds, projects) tuples
         ack_message = ROLES_MESSAGE_ACK.format(
             staff_role=str(self.cached_roles['staff'].id))
 
@@ -220,82 +634,229 @@ class ProjectsClient(commands.Bot):
             color=0xff0000,
         )
 
-        PROJECTS_PER_MESSAGE = 10
         EMBED_DESCRIPTION_LIMIT = 4096
         EMBEDS_CHAR_SUM = 6000
 
+        rendered = []
         description = ""
-        project_emojis = []
-        projects_in_message = 0
-        messages_sent = 0
-
-        for pi, (key, project) in enumerate(self.projects.items()):
-            description += ROLES_PROJECT_MESSAGE.format(
+        message_projects = []
+
+        def flush():
+            embeds = []
+            content = None
+            if not rendered:
+                embeds.append(ack_embed)
+                content = ROLES_MESSAGE
+
+            embed = discord.Embed(
+                title='Projects',
+                description=description,
+                color=0x00ff00,
+            )
+            embeds.append(embed)
+            rendered.append((content, embeds, message_projects))
+
+        for key, project in self.projects.items():
+            line = ROLES_PROJECT_MESSAGE.format(
                 emoji=project.emoji, title=project.title, link=project.link,
                 key=key, guild=self._guild.id, channel=project.text.id)
-            description += "\n"
-
-            project_emojis.append(project.emoji)
-            projects_in_message += 1
+            line += "\n"
 
             description_limit = EMBED_DESCRIPTION_LIMIT
-            if messages_sent == 0:
+            if not rendered:
                 sum_limit = EMBEDS_CHAR_SUM - len(str(ack_embed.description))
                 description_limit = min(description_limit, sum_limit)
 
-            if (len(description) >= description_limit
-                    or projects_in_message >= PROJECTS_PER_MESSAGE
-                    or pi == len(self.projects) - 1):
+            # Start a new message when this one is full or already shows
+            # the emoji of the project
+            if message_projects and (
+                    len(message_projects) >= self.projects_per_message
+                    or len(description) + len(line) > description_limit
+                    or any(p.emoji == project.emoji for p in message_projects)):
+                flush()
+                description = ""
+                message_projects = []
 
-                embeds = []
-                content = None
-                if messages_sent == 0:
-                    embeds.append(ack_embed)
-                    content = ROLES_MESSAGE
+            description += line
+            message_projects.append(project)
 
-                embed = discord.Embed(
-                    title='Projects',
-                    description=description,
-                    color=0x00ff00,
-                )
-                embeds.append(embed)
+        if message_projects:
+            flush()
 
-                if messages_sent >= len(self._role_messages):
-                    message = await self.roles_channel.send(
-                        content=content,
-                        embeds=embeds
-                    )
-                    self._role_messages_ids.append(message.id)
-                else:
-                    message = self._role_messages[messages_sent]
+        return rendered
+
+    def index_reaction_roles(self, rendered):
+        # Map the reactions of each roles message to their projects
+        self.reaction_roles = {
+            (message_id, project.emoji): project
+            for message_id, (_, _, projects) in zip(self._role_messages_ids, rendered)
+            for project in projects
+        }
+
+    def save_snapshot(self):
+        self.snapshot.projects = {
+            key: project.snapshot() for key, project in self.projects.items()
+        }
+        self.snapshot.roles_messages = list(self._role_messages_ids)
+        self.snapshot.save()
+
+    async def ensure_roles_message(self):
+        with self.roles_message_latency.time():
+            await self._ensure_roles_message()
+
+    async def _ensure_roles_message(self):
+        logger.info("Ensuring roles messages")
+        rendered = self.render_roles_messages()
+
+        self._role_messages = []
+        async for message in self.roles_channel.history(limit=len(rendered) + 10, oldest_first=True):
+            if len(message.embeds) < 1:
+                continue
+            if message.embeds[-1].title != 'Projects':
+                continue
+            self._role_messages.append(message)
+        self._role_messages_ids = [m.id for m in self._role_messages]
+
+        # The messages of the snapshot are up to date when their rendering
+        # did not change and they are all still in the channel; their
+        # reactions are checked all the same
+        digest = roles_digest(rendered)
+        unchanged = (self.snapshot.roles_digest == digest
+                     and self.snapshot.roles_messages == self._role_messages_ids)
+        if unchanged:
+            logger.info("Roles messages unchanged since the snapshot")
+        self.snapshot.roles_digest = digest
+
+        reactions = []
+        for mi, (content, embeds, projects) in enumerate(rendered):
+            project_emojis = [p.emoji for p in projects]
+            if mi >= len(self._role_messages):
+                message = await self.roles_channel.send(
+                    content=content,
+                    embeds=embeds
+                )
+                self._role_messages_ids.append(message.id)
+            else:
+                message = self._role_messages[mi]
+                # Only edit the messages whose content changed
+                if not unchanged and not same_message(message, content, embeds):
                     await message.edit(
                         content=content,
                         embeds=embeds
                     )
-
-                for pe in project_emojis:
-                    await message.add_reaction(pe)
-
-                # Reset for next message
-                description = ""
-                project_emojis = []
-                projects_in_message = 0
-
-                messages_sent += 1
+                else:
+                    logger.info(f"Roles message {message.id} is up to date")
+
+            # Only add the reactions missing from the message, and drop the
+            # ones of projects moved to another message, which would count
+            # against the reactions limit
+            existing = {str(r.emoji) for r in message.reactions if r.me}
+            reactions += [
+                message.remove_reaction(e, self.user)
+                for e in existing if e not in project_emojis
+            ]
+            reactions += [
+                message.add_reaction(pe)
+                for pe in project_emojis if pe not in existing
+            ]
+
+        await gather_bounded(reactions, REACTIONS_CONCURRENCY)
+
+        # Delete the roles messages left over after projects were archived
+        if rendered:
+            for message in self._role_messages[len(rendered):]:
+                await message.delete()
+                self._role_messages_ids.remove(message.id)
+
+        self.index_reaction_roles(rendered)
 
     async def reaction_role(self, payload, add):
         # Handle adding or removing roles based on reactions
-        if (payload.message_id not in self._role_messages_ids
-                or str(payload.emoji) not in self.projects_emoji
-                or payload.user_id == self.user.id):
+        project = self.reaction_roles.get((payload.message_id, str(payload.emoji)))
+        if project is None or payload.user_id == self.user.id:
             return
 
-        project = self.projects_emoji[str(payload.emoji)]
-        user = await self.roles_channel.guild.fetch_member(payload.user_id)
-        if add:
-            await user.add_roles(project.role)
-        else:
-            await user.remove_roles(project.role)
+        # Queue the change; the latest reaction event for a role wins
+        pending = self._pending_roles.setdefault(payload.user_id, {})
+        pending[project.role.id] = (project.role, add, time.perf_counter())
+
+        # Changes arriving within the debounce window are applied together
+        # by one task per member
+        if payload.user_id not in self._role_tasks:
+            self._role_tasks[payload.user_id] = asyncio.create_task(
+                self.apply_member_roles(payload.user_id))
+
+    async def get_member(self, user_id):
+        # Use the member cache, and only fall back to a REST call when the
+        # member is not cached
+        guild = self.roles_channel.guild
+        member = guild.get_member(user_id)
+        if member is None:
+            member = await guild.fetch_member(user_id)
+        return member
+
+    async def apply_member_roles(self, user_id):
+        # Role changes already sent by this task, applied again on top of
+        # the member in case the cache did not receive the update yet
+        applied = {}
+        try:
+            while self._pending_roles.get(user_id):
+                await asyncio.sleep(ROLES_DEBOUNCE)
+                changes = self._pending_roles.pop(user_id)
+                applied.update(changes)
+
+                # Look the member up after the wait: editing the roles
+                # replaces the whole list, so it must include the roles
+                # granted by staff or other bots in the meantime
+                member = await self.get_member(user_id)
+                current = {r.id: r for r in member.roles if not r.is_default()}
+                roles = dict(current)
+                for role_id, (role, add, _) in applied.items():
+                    if add:
+                        roles[role_id] = role
+                    else:
+                        roles.pop(role_id, None)
+
+                if roles.keys() != current.keys():
+                    await member.edit(roles=list(roles.values()))
+
+                now = time.perf_counter()
+                for role, add, queued in changes.values():
+                    self.reaction_role_latency.observe(now - queued, action='add' if add else 'remove')
+        except discord.HTTPException as e:
+            logger.error(f"Failed to update the roles of member {user_id}: {e}")
+            self._pending_roles.pop(user_id, None)
+        finally:
+            self._role_tasks.pop(user_id, None)
+
+    def is_own_guild(self, item):
+        return self._guild is not None and item.guild.id == self._guild_id
+
+    async def on_guild_role_create(self, role):
+        if self.is_own_guild(role):
+            self.index_role(role)
+
+    async def on_guild_role_delete(self, role):
+        if self.is_own_guild(role):
+            self.unindex_role(role)
+
+    async def on_guild_role_update(self, before, after):
+        if self.is_own_guild(after) and before.name != after.name:
+            self.unindex_role(before)
+            self.index_role(after)
+
+    async def on_guild_channel_create(self, channel):
+        if self.is_own_guild(channel):
+            self.index_channel(channel)
+
+    async def on_guild_channel_delete(self, channel):
+        if self.is_own_guild(channel):
+            self.unindex_channel(channel)
+
+    async def on_guild_channel_update(self, before, after):
+        if self.is_own_guild(after) and self.channel_index(before) != self.channel_index(after):
+            self.unindex_channel(before)
+            self.index_channel(after)
 
     async def on_raw_reaction_add(self, payload):
         # Handle event when a reaction is added
@@ -305,7 +866,26 @@ class ProjectsClient(commands.Bot):
         # Handle event when a reaction is removed
         await self.reaction_role(payload, False)
 
-if __name__ == '__main__':
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Discord bot managing the project roles and channels')
+    parser.parse_args(argv)
+
+    # Load environment variables from the .env file
+    load_dotenv()
+
+    # Retrieve the environment variables from the .env file
+    discord_token = os.getenv('DISCORD_TOKEN')
+    guild_id = int(os.getenv('DISCORD_GUILD_ID'))
+    roles_channel_id = int(os.getenv('DISCORD_ROLES_CHANNEL'))
+
     # Initialize and run the bot
-    client = ProjectsClient(guild_id, roles_channel_id)
+    archive_removed = os.getenv('DISCORD_ARCHIVE_REMOVED', '') == '1'
+    lean = os.getenv('DISCORD_LEAN', '') == '1'
+    metrics_port = int(os.getenv('DISCORD_METRICS_PORT') or 0) or None
+    projects_per_message = int(os.getenv('DISCORD_PROJECTS_PER_MESSAGE') or PROJECTS_PER_MESSAGE)
+    client = ProjectsClient(guild_id, roles_channel_id, archive_removed=archive_removed, lean=lean,
+                            metrics_port=metrics_port, projects_per_message=projects_per_message)
     client.run(discord_token)
+
+if __name__ == '__main__':
+    main()
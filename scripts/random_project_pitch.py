@@ -1,10 +1,12 @@
+import argparse
 import random
 import yaml
 
+from data_cache import load_projects
+
 
 def random_project_pitch():
-    with open('./_data/projects.yml') as f:
-        issues_list = yaml.safe_load(f)
+    issues_list = load_projects('./_data/projects.yml')
     project_by_hub = {
         'multi':{
             'Americas':[],
@@ -33,5 +35,11 @@ def random_project_pitch():
     with open('./_data/pitch_order.yml', 'w') as f:
         yaml.dump(project_by_hub, f, default_flow_style=False, sort_keys=False)
 
-if __name__ == '__main__':
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write the pitch order of the projects to _data/pitch_order.yml')
+    parser.parse_args(argv)
+
     random_project_pitch()
+
+if __name__ == '__main__':
+    main()
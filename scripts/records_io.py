@@ -0,0 +1,111 @@
+# Reading and writing of record files (JSON arrays, NDJSON or YAML lists)
+import json
+import os
+import tempfile
+
+# Output formats supported by write_records
+FORMATS = ('json', 'ndjson')
+
+
+def _indent(text, indent):
+    pad = ' ' * indent
+    return '\n'.join(pad + line for line in text.split('\n'))
+
+
+def atomic_write(path, data):
+    # Write `data` (str, bytes, or an iterable of str or bytes chunks)
+    # into a temporary file next to `path`, then rename it into place, so
+    # readers never see a partially written file and a crash leaves the
+    # previous file intact. The permissions of the replaced file are kept.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            chunks = [data] if isinstance(data, (str, bytes)) else data
+            for chunk in chunks:
+                f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _record_chunks(records, format, indent):
+    if format == 'ndjson':
+        for record in records:
+            yield json.dumps(record, separators=(',', ':')) + '\n'
+        return
+
+    # Same layout as json.dump(list(records), f, indent=indent)
+    separator = ',\n' if indent is not None else ', '
+    empty = True
+    for record in records:
+        if empty:
+            yield '[\n' if indent is not None else '['
+        else:
+            yield separator
+        empty = False
+        text = json.dumps(record, indent=indent)
+        yield _indent(text, indent) if indent is not None else text
+    if empty:
+        yield '[]'
+    else:
+        yield '\n]' if indent is not None else ']'
+
+
+def write_records(path, records, format='json', indent=2):
+    # Stream the records into place with atomic_write. `indent=None` writes
+    # compact JSON; NDJSON is always one record per line.
+    if format not in FORMATS:
+        raise ValueError(f'Unknown records format: {format}')
+    atomic_write(path, _record_chunks(records, format, indent))
+
+
+def iter_json_documents(text):
+    # Yield the records of a JSON array, NDJSON, or concatenated JSON
+    # arrays such as the output of `gh api --paginate`, decoding one
+    # record at a time
+    decoder = json.JSONDecoder()
+    end = len(text)
+    pos = 0
+    in_array = False
+    while True:
+        # Skip the whitespace, newlines and commas between values
+        while pos < end and (text[pos].isspace() or (in_array and text[pos] == ',')):
+            pos += 1
+        if pos == end:
+            return
+        if not in_array and text[pos] == '[':
+            in_array = True
+            pos += 1
+            continue
+        if in_array and text[pos] == ']':
+            in_array = False
+            pos += 1
+            continue
+        value, pos = decoder.raw_decode(text, pos)
+        yield value
+
+
+def iter_records(path):
+    # Lazily yield the records of a file written by write_records, or of a
+    # YAML data file (a list, or the `projectlist` of _data/projects.yml)
+    if path.endswith(('.yml', '.yaml')):
+        import yaml
+        # Use the C loader of libyaml when PyYAML was built with it
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        with open(path) as f:
+            data = yaml.load(f, Loader=loader) or []
+        if isinstance(data, dict):
+            data = data.get('projectlist') or []
+        yield from data
+        return
+
+    with open(path) as f:
+        text = f.read()
+    yield from iter_json_documents(text)
@@ -1,34 +1,202 @@
+import argparse
+import json
 import os
-import yaml
-import tweepy
+import re
+import time
 
-auth = tweepy.OAuthHandler(os.getenv('TWITTER_CUSTOMER_KEY'), os.getenv('TWITTER_CUSTOMER_SECRET'))
-auth.set_access_token(os.getenv('TWITTER_ACCESS_TOKEN'), os.getenv('TWITTER_ACCESS_SECRET'))
-api = tweepy.API(auth)
+from data_cache import load_projects
+from records_io import atomic_write
 
-screenname = os.getenv('TWITTER_USERNAME')
-from_tweet_id = os.getenv('TWITTER_FIRST_TWEET_ID')
-tweets = api.user_timeline(screen_name=screenname, since_id=from_tweet_id, count=200, include_rts=False, exclude_replies=True)
+# Define the file keeping the hashtags seen on the timeline and the last
+# tweet read, so that later runs only fetch newer tweets
+STATE_PATH = './.cache/tweet_state.json'
 
-with open('_data/projects.yml', 'r') as f:
-    projects = yaml.safe_load(f)
+# Define the ledger of the projects already announced
+LEDGER_PATH = './.cache/tweet_ledger.json'
 
-class TweetFound(Exception): pass
+# Define the spacing between posts and how failed posts are retried, in seconds
+POST_INTERVAL = 30
+POST_RETRIES = 3
+POST_BACKOFF = 60
 
-for p in projects:
+# Define the Twitter error code of a duplicate status
+DUPLICATE_STATUS_CODE = 187
 
-    if p.get('twiter') is None:
-        continue
+# Define the number of tweets per timeline page (the API maximum)
+TIMELINE_PAGE_SIZE = 200
 
-    try:
-        for t in tweets:
-            if '#' + p['chat_channel'] in t.text:
-                raise TweetFound()
-    except TweetFound:
-        continue
-    else:
-        tweet = 'New Hackathon project: ' + p['twiter'] + ' #' + p['chat_channel']
-        api.update_status(
+# Matches hashtags as posted, with the dashes and dots of the project
+# channel names (e.g. #bids-2.0); trailing punctuation is stripped
+HASHTAG_RE = re.compile(r'#(\S+)')
+HASHTAG_TRAILING = '.,;:!?)]}"\'…'
+
+def make_api():
+    import tweepy
+    auth = tweepy.OAuthHandler(os.getenv('TWITTER_CUSTOMER_KEY'), os.getenv('TWITTER_CUSTOMER_SECRET'))
+    auth.set_access_token(os.getenv('TWITTER_ACCESS_TOKEN'), os.getenv('TWITTER_ACCESS_SECRET'))
+    return tweepy.API(auth)
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {'since_id': None, 'hashtags': []}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_PATH):
+    atomic_write(path, json.dumps(state))
+
+def fetch_timeline(api, screen_name, since_id=None):
+    # Fetch every tweet newer than `since_id`, paging backwards with max_id
+    tweets = []
+    max_id = None
+    while True:
+        page = api.user_timeline(
+            screen_name=screen_name, since_id=since_id, max_id=max_id,
+            count=TIMELINE_PAGE_SIZE, include_rts=False, exclude_replies=True)
+        if not page:
+            return tweets
+        tweets += page
+        max_id = min(t.id for t in page) - 1
+
+def extract_hashtags(text):
+    tags = (tag.rstrip(HASHTAG_TRAILING) for tag in HASHTAG_RE.findall(text))
+    return {tag for tag in tags if tag}
+
+def chat_channel(project):
+    return project.get('chat_channel') or project.get('chatchannel') or project.get('shortname')
+
+class Ledger:
+    # Local record of the projects already announced, keyed by issue number
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self.posted = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.posted = json.load(f)
+
+    def __contains__(self, issue_number):
+        return str(issue_number) in self.posted
+
+    def record(self, issue_number, tweet_id=None):
+        # Save right away, so an interrupted run never posts twice
+        self.posted[str(issue_number)] = {'tweet_id': tweet_id, 'posted_at': int(time.time())}
+        atomic_write(self.path, json.dumps(self.posted, indent=2))
+
+def error_status(error):
+    # HTTP status of a tweepy error, None for other errors
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', getattr(response, 'status', None))
+
+def is_retryable(error):
+    # Rate limits and server errors pass; other errors, such as a duplicate
+    # status or bad credentials, fail the same way when retried
+    status = error_status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+def is_duplicate(error):
+    return DUPLICATE_STATUS_CODE in (getattr(error, 'api_codes', None) or [])
+
+class PostQueue:
+    # Posts tweets one after the other, spaced by `interval` seconds, and
+    # retries posts failing on rate limits or server errors with an
+    # exponential backoff
+    def __init__(self, api, interval=POST_INTERVAL, retries=POST_RETRIES, backoff=POST_BACKOFF, sleep=time.sleep):
+        self.api = api
+        self.interval = interval
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.queue = []
+        self.last_post = None
+
+    def put(self, text, on_posted, **kwargs):
+        self.queue.append((text, kwargs, on_posted))
+
+    def post(self, text, kwargs):
+        # The backoff between retries already spaces the posts out
+        if self.last_post is not None:
+            self.sleep(max(0, self.last_post + self.interval - time.monotonic()))
+        backoff = self.backoff
+        for attempt in range(self.retries + 1):
+            self.last_post = time.monotonic()
+            try:
+                return self.api.update_status(text, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                print(f'Failed to post tweet, retrying in {backoff}s: {e}')
+                self.sleep(backoff)
+                backoff *= 2
+
+    def run(self):
+        while self.queue:
+            text, kwargs, on_posted = self.queue.pop(0)
+            try:
+                status = self.post(text, kwargs)
+            except Exception as e:
+                # A duplicate was already posted, record it as such
+                if is_duplicate(e):
+                    print(f'Tweet already posted: {text}')
+                    on_posted(None)
+                    continue
+                # Bad credentials fail every post, stop the run
+                if error_status(e) == 401:
+                    raise
+                print(f'Failed to post tweet: {text}: {e}')
+                continue
+            on_posted(status)
+
+def tweet_projects(api, projects_path='_data/projects.yml', state_path=STATE_PATH, ledger_path=LEDGER_PATH):
+    ledger = Ledger(ledger_path)
+
+    # Projects already in the ledger cost a lookup, and when every project
+    # was announced the timeline is not even fetched. The projects are
+    # indexed by issue number whichever name the data file gives it.
+    projects = [
+        (number, p) for number, p in load_projects(projects_path).by_issue_number.items()
+        if p.get('twiter') is not None and number not in ledger
+    ]
+    if not projects:
+        return
+
+    screenname = os.getenv('TWITTER_USERNAME')
+    state = load_state(state_path)
+
+    # Only fetch the tweets posted since the last run
+    since_id = state['since_id'] or os.getenv('TWITTER_FIRST_TWEET_ID')
+    tweets = fetch_timeline(api, screenname, since_id)
+
+    # Index the hashtags of the timeline once
+    hashtags = set(state['hashtags'])
+    for t in tweets:
+        hashtags |= extract_hashtags(t.text)
+    if tweets:
+        state['since_id'] = max(t.id for t in tweets)
+    state['hashtags'] = sorted(hashtags)
+    save_state(state, state_path)
+
+    queue = PostQueue(api)
+    for number, p in projects:
+
+        # Record projects announced outside of the ledger
+        if chat_channel(p) in hashtags:
+            ledger.record(number)
+            continue
+
+        tweet = 'New Hackathon project: ' + p['twiter'] + ' #' + chat_channel(p)
+        queue.put(
             tweet.format(**p),
-            attachment_url=p['issue_link']
+            lambda status, number=number: ledger.record(number, getattr(status, 'id', None)),
+            attachment_url=p.get('issue_link')
         )
+    queue.run()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tweet the projects not announced yet')
+    parser.add_argument('--projects', default='_data/projects.yml', help='projects data file')
+    args = parser.parse_args(argv)
+
+    tweet_projects(make_api(), args.projects)
+
+if __name__ == '__main__':
+    main()